@@ -0,0 +1,210 @@
+# coding=utf-8
+"""
+Benchmarks of events triggering, binding and wild cards resolution.
+
+Usage:
+    python -m eevent.bench --output results.json
+    python -m eevent.bench --baseline results.json --threshold 0.2
+
+Every trigger scenario is measured in two modes:
+    hot - dispatch plan is cached (registry hasn't changed since the last trigger)
+    cold - registry is changed before every trigger, so handlers are resolved again
+"""
+
+from __future__ import print_function
+
+import sys
+import json
+import platform
+import argparse
+from timeit import default_timer
+
+from eevent.events import Events
+
+
+SIZES = [10, 100, 1000, 10000, 100000]
+HANDLERS = [1, 10, 100, 1000]
+MODES = ['hot', 'cold']
+
+# Registered wild card events (to check reverse matching)
+WILD_CARDS = ['app:~:e0', 'app:*', '*:e0']
+
+
+def handler(*args, **kwargs):
+    return None
+
+
+def build_events(size, handlers):
+    """
+    Registers `size` events like 'app:m<module>:e<number>' (~100 events per module),
+    a few wild card events and `handlers` handlers on 'plain' and 'app:m0:e0' events.
+    """
+    e = Events()
+    modules = max(1, size // 100)
+    for i in range(size):
+        e['app:m{}:e{}'.format(i % modules, i)] = [handler]
+    for event in ['app', 'app:m0'] + WILD_CARDS:
+        e[event] = [handler]
+
+    target_handlers = [(lambda *args, **kwargs: None) for _ in range(handlers)]
+    e['plain'] = target_handlers
+    e['app:m0:e0'] = target_handlers
+    return e
+
+
+def _trigger(events, propagate=None):
+    def scenario(e):
+        options = {} if propagate is None else e.options(propagate=propagate)
+        return lambda: e.trigger(events, **options)
+    return scenario
+
+
+def _emitter(e):
+    emit = e.emitter('app:m0:e0:x')
+    return lambda: emit()
+
+
+def _on_off(e):
+    def bind():
+        e.on('app:m0:e0', handler)
+        e.off('app:m0:e0', handler)
+    return bind
+
+
+SCENARIOS = {
+    'plain': _trigger('plain'),
+    'hierarchical': _trigger('app:m0:e0:x'),
+    'deep': _trigger('app:m0', Events.ES_PROPAGATE_CURRENT | Events.ES_PROPAGATE_TO_DEEP),
+    'wild_card': _trigger('app:m0:*', Events.ES_PROPAGATE_CURRENT),
+    'soft_wild_card': _trigger('app:~:e0', Events.ES_PROPAGATE_CURRENT),
+    'reverse_wild_card': _trigger('app:m0:e0', Events.ES_PROPAGATE_CURRENT),
+    'emitter': _emitter,
+}
+
+# Scenarios which change the registry themselves (measured once)
+CHANGING_SCENARIOS = {
+    'on_off': _on_off,
+}
+
+
+def measure(func, min_time=0.1, repeat=3):
+    """
+    Returns the best time of one call and number of calls per measurement
+    """
+    def timed(number):
+        started = default_timer()
+        for _ in range(number):
+            func()
+        return default_timer() - started
+
+    number = 1
+    elapsed = timed(number)
+    while elapsed < min_time:
+        number *= 2
+        elapsed = timed(number)
+
+    best = min([elapsed] + [timed(number) for _ in range(repeat - 1)])
+    return best / number, number
+
+
+def cold(e, func):
+    def call():
+        e._changed()
+        return func()
+    return call
+
+
+def run(sizes=SIZES, handlers=HANDLERS, scenarios=None, modes=MODES, min_time=0.1, repeat=3, log=None):
+    """
+    Runs benchmarks, returns results as a list of dicts
+    """
+    scenarios = scenarios or sorted(list(SCENARIOS) + list(CHANGING_SCENARIOS))
+    results = []
+    for size in sizes:
+        for handlers_count in handlers:
+            e = build_events(size, handlers_count)
+            for name in scenarios:
+                if name in CHANGING_SCENARIOS:
+                    runs = [('cold', CHANGING_SCENARIOS[name](e))]
+                else:
+                    func = SCENARIOS[name](e)
+                    runs = [(mode, cold(e, func) if mode == 'cold' else func) for mode in modes]
+                for mode, func in runs:
+                    seconds, number = measure(func, min_time=min_time, repeat=repeat)
+                    result = {'scenario': name, 'mode': mode, 'events': size,
+                              'handlers': handlers_count, 'seconds': seconds, 'number': number}
+                    results.append(result)
+                    if log is not None:
+                        log('{scenario:>18} {mode:>4} events={events:<6} handlers={handlers:<4} '
+                            '{usec:12.2f} usec'.format(usec=seconds * 1e6, **result))
+    return results
+
+
+def _key(result):
+    return result['scenario'], result['mode'], result['events'], result['handlers']
+
+
+def compare(results, baseline, threshold=0.2):
+    """
+    Returns results which are slower than baseline more than on `threshold` (fraction)
+    as (result, baseline result) pairs
+    """
+    baseline = dict((_key(result), result) for result in baseline)
+    regressions = []
+    for result in results:
+        base = baseline.get(_key(result))
+        if base is not None and result['seconds'] > base['seconds'] * (1 + threshold):
+            regressions.append((result, base))
+    return regressions
+
+
+def _ints(value):
+    return [int(v) for v in value.split(',')]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m eevent.bench', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=_ints, default=SIZES, help='registry sizes (comma separated)')
+    parser.add_argument('--handlers', type=_ints, default=HANDLERS, help='handlers counts (comma separated)')
+    parser.add_argument('--scenarios', type=lambda v: v.split(','), default=None,
+                        help='scenarios to run: {}'.format(','.join(sorted(list(SCENARIOS) + list(CHANGING_SCENARIOS)))))
+    parser.add_argument('--modes', type=lambda v: v.split(','), default=MODES, help='hot,cold')
+    parser.add_argument('--min-time', type=float, default=0.1, help='min time of one measurement (seconds)')
+    parser.add_argument('--repeat', type=int, default=3, help='number of measurements (the best one is taken)')
+    parser.add_argument('--output', help='file to save results (stdout by default)')
+    parser.add_argument('--baseline', help='file with saved results to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown against baseline (fraction)')
+    parser.add_argument('--quiet', action='store_true', help="don't print progress and regressions to stderr")
+    args = parser.parse_args(argv)
+
+    log = None if args.quiet else (lambda line: print(line, file=sys.stderr))
+    results = run(sizes=args.sizes, handlers=args.handlers, scenarios=args.scenarios, modes=args.modes,
+                  min_time=args.min_time, repeat=args.repeat, log=log)
+    report = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'results': results,
+    }
+
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for result, base in regressions:
+            if log is not None:
+                log('REGRESSION {scenario} {mode} events={events} handlers={handlers}: '
+                    '{usec:.2f} usec (baseline {base_usec:.2f} usec)'.format(
+                        usec=result['seconds'] * 1e6, base_usec=base['seconds'] * 1e6, **result))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+# coding=utf-8
+"""
+Deferred triggering of events with coalescing of duplicates
+"""
+
+import threading
+from collections import OrderedDict
+from timeit import default_timer
+
+from eevent.watchdog import shared_watchdog
+
+
+def trigger_key(event, args, kwargs):
+    """
+    Default coalescing key: triggers of the same event with the same arguments are merged
+    """
+    try:
+        key = (event, args, tuple(sorted(kwargs.items())))
+        hash(key)
+    except TypeError:  # unhashable arguments are never merged
+        key = object()
+    return key
+
+
+def event_key(event, args, kwargs):
+    """
+    Coalescing key which merges all triggers of the same event
+    """
+    return event
+
+
+def keep_last(old, new):
+    return new
+
+
+def keep_first(old, new):
+    return old
+
+
+class DeferredEvents(object):
+    """
+    Queue of deferred triggers of Events.
+
+    Enqueued triggers with the same key (`key(event, args, kwargs)`) are coalesced:
+    `merge((args, kwargs), (new_args, new_kwargs))` returns the arguments of the survivor
+    (the last ones by default), the survivor keeps the place of the first trigger.
+    `flush` fires the survivors in one batch (see Events.trigger_many).
+
+    The queue is flushed automatically when it holds `max_size` triggers
+    or when its oldest trigger waits `max_delay` seconds: by the shared watchdog
+    (so handlers are called in its thread and should be short) or by the next enqueue, whichever is first.
+    Options of triggers (with KWARGS_PREFIX in name) are given once for the queue.
+    """
+
+    def __init__(self, events, key=trigger_key, merge=keep_last, max_size=None, max_delay=None, **options):
+        self.events = events
+        self.key = key
+        self.merge = merge
+        self.max_size = max_size
+        self.max_delay = max_delay
+        self.options = options
+        self.enqueued = 0
+        self.coalesced = 0
+        self._pending = OrderedDict()
+        self._oldest = None
+        self._timer = None  # watchdog entry which flushes pending triggers after max_delay
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._pending)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.flush()
+
+    def enqueue(self, event, *args, **kwargs):
+        """
+        Defers a trigger of the event, returns True if it was coalesced with a pending one
+        """
+        key = self.key(event, args, kwargs)
+        with self._lock:
+            self.enqueued += 1
+            pending = self._pending.get(key)
+            if pending is not None:
+                self.coalesced += 1
+                self._pending[key] = (event,) + tuple(self.merge(pending[1:], (args, kwargs)))
+            else:
+                self._pending[key] = (event, args, kwargs)
+                if self._oldest is None:
+                    self._oldest = default_timer()
+                    if self.max_delay is not None and self.max_delay > 0:
+                        self._timer = shared_watchdog().call_later(self.max_delay, self._expired)
+            due = ((self.max_size is not None and len(self._pending) >= self.max_size) or
+                   (self.max_delay is not None and default_timer() - self._oldest >= self.max_delay))
+        if due:
+            self.flush()
+        return pending is not None
+
+    def discard(self):
+        """
+        Drops pending triggers, returns their number
+        """
+        return len(self._take())
+
+    def flush(self):
+        """
+        Fires pending triggers, returns their results (as Events.trigger_many yields them).
+        Triggers which are enqueued by handlers are left for the next flush.
+        """
+        pending = self._take()
+        if not pending:
+            return []
+        return list(self.events.trigger_many(pending.values(), **self.options))
+
+    def _take(self):
+        with self._lock:
+            pending, self._pending, self._oldest = self._pending, OrderedDict(), None
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            shared_watchdog().cancel(timer)
+        return pending
+
+    def _expired(self):
+        with self._lock:
+            # the timer can be late for the triggers it was started for
+            due = self._oldest is not None and default_timer() - self._oldest >= self.max_delay
+        if due:
+            self.flush()
@@ -3,9 +3,1056 @@
 Class to generate custom events
 """
 
-import re
-from itertools import chain
-from functools import partial
+import sys
+import types
+import pickle
+import inspect
+import weakref
+import threading
+from bisect import bisect_right
+from collections import OrderedDict, namedtuple
+from itertools import chain, count
+from timeit import default_timer
+from functools import partial, wraps
+
+from eevent.deferred import DeferredEvents
+from eevent.exceptions import StopPropagation
+from eevent.history import History, Record
+from eevent.instrumentation import Instrumentation
+from eevent.watchdog import Watchdog
+
+try:
+    import asyncio
+except ImportError:  # python 2
+    asyncio = None
+
+try:
+    from concurrent import futures
+except ImportError:  # python 2 without futures package
+    futures = None
+
+try:
+    basestring
+except NameError:  # python 3
+    basestring = str
+
+# dicts keep insertion order since python 3.7
+ordered_dict = dict if sys.version_info >= (3, 7) else OrderedDict
+
+try:
+    _intern = sys.intern
+except AttributeError:  # python 2
+    _intern = intern
+
+
+def intern_name(name):
+    """
+    Shares equal names (and segments of names) in memory
+    """
+    try:
+        return _intern(name)
+    except TypeError:  # unicode on python 2
+        return name
+
+
+def deep_sizeof(obj, seen=None):
+    """
+    Memory used by the object and containers/objects it holds (callables aren't counted).
+    Objects from `seen` are skipped (it's filled by the counted objects).
+    """
+    seen = set() if seen is None else seen
+    size = 0
+    objects = [obj]
+    while objects:
+        obj = objects.pop()
+        if id(obj) in seen or (callable(obj) and not isinstance(obj, type)):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            objects.extend(obj.keys())
+            objects.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            objects.extend(obj)
+        if hasattr(obj, '__dict__') and not isinstance(obj, type):
+            objects.append(obj.__dict__)
+        for slot in getattr(type(obj), '__slots__', ()):
+            if slot != '__weakref__' and hasattr(obj, slot):
+                objects.append(getattr(obj, slot))
+    return size
+
+
+PlansInfo = namedtuple('PlansInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+class LRUCache(object):
+    """
+    Cache of limited size, drops least recently used items.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = self.misses = self.evictions = 0
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key, default=None):
+        try:
+            value = self._items.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self._items[key] = value
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._items.pop(key, None)
+        while self._items and len(self._items) >= self.maxsize:
+            self._items.popitem(last=False)
+            self.evictions += 1
+        self._items[key] = value
+
+    def clear(self):
+        self._items.clear()
+
+    def info(self):
+        return CacheInfo(self.hits, self.misses, self.evictions, self.maxsize, len(self._items))
+
+
+class HandlerOptions(object):
+    """
+    Options of a bound handler.
+        cpu_bound - handler is run in a process pool by trigger_threaded and trigger_async
+        priority - handlers with higher priority are called first
+        timeout - time budget (seconds) of the handler in trigger_threaded and trigger_async
+        optional - handler can be skipped when the time budget of a trigger is spent
+    """
+
+    __slots__ = ('cpu_bound', 'priority', 'timeout', 'optional')
+
+    def __init__(self, cpu_bound=False, priority=0, timeout=None, optional=False):
+        self.cpu_bound = cpu_bound
+        self.priority = priority
+        self.timeout = timeout
+        self.optional = optional
+
+    def __repr__(self):
+        return '{}(cpu_bound={!r}, priority={!r}, timeout={!r}, optional={!r})'.format(
+            self.__class__.__name__, self.cpu_bound, self.priority, self.timeout, self.optional)
+
+    def _key(self):
+        return self.cpu_bound, self.priority, self.timeout, self.optional
+
+    def __eq__(self, other):
+        if isinstance(other, HandlerOptions):
+            return self._key() == other._key()
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __reduce__(self):
+        if self is DEFAULT_HANDLER_OPTIONS:
+            return 'DEFAULT_HANDLER_OPTIONS'  # handlers check default options by identity
+        return self.__class__, self._key()
+
+
+DEFAULT_HANDLER_OPTIONS = HandlerOptions()
+
+
+def priority_index(options, priority):
+    """
+    Index to insert a handler with the priority into handlers with the options
+    (sorted by priority, handlers of the same priority are kept in insertion order)
+    """
+    if not options or options[-1].priority >= priority:
+        return len(options)
+    return bisect_right([-o.priority for o in options], -priority)
+
+
+class Handlers(object):
+    """
+    Ordered set of event handlers: by priority, then by insertion.
+    Provides list-like methods to bind and unbind handlers.
+    Keeps options of every handler (see `items`, `values`).
+
+    A few handlers of default priority (the common case) are kept in a list.
+    More handlers or handlers with priorities are kept in buckets by priority
+    (in insertion order) with sorted distinct priorities, so binding and unbinding take O(1)
+    (O(log p) for a new priority, where p is the number of distinct priorities).
+
+    Changes of handlers registered in Events invalidate cached dispatch plans of the registry
+    (handlers of ThreadSafeEvents are changed without the lock, so use `on` and `off` there).
+    """
+
+    SMALL_SIZE = 8  # max number of handlers kept in a list
+
+    __slots__ = ('_handlers', '_options', '_buckets', '_priorities', '_registry')
+
+    def __init__(self, handlers=()):
+        self._handlers = []  # listed handlers (None when they are kept in buckets)
+        self._options = None  # options of listed handlers (None if all default) or options by handler
+        self._buckets = None  # priority -> ordered dict of handler -> options
+        self._priorities = None  # negated priorities in ascending order
+        self._registry = None  # weak reference to Events (see Events.__setitem__)
+        self.extend(handlers)
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, list(self))
+
+    def __reduce__(self):
+        return self.__class__, (self.items(),)
+
+    def __iter__(self):
+        if self._buckets is None:
+            return iter(self._handlers)
+        return self._iter_buckets()
+
+    def _iter_buckets(self):
+        buckets = self._buckets
+        for priority in self._priorities:
+            for handler in buckets[-priority]:
+                yield handler
+
+    def __len__(self):
+        return len(self._handlers) if self._buckets is None else len(self._options)
+
+    def __contains__(self, handler):
+        return handler in (self._handlers if self._buckets is None else self._options)
+
+    def __getitem__(self, handler):
+        if self._buckets is not None:
+            return self._options[handler]
+        index = self._index(handler)
+        return DEFAULT_HANDLER_OPTIONS if self._options is None else self._options[index]
+
+    def __setitem__(self, handler, options):
+        self.add(handler, options)
+
+    def __delitem__(self, handler):
+        self.remove(handler)
+
+    def __eq__(self, other):
+        if isinstance(other, Handlers):
+            return self.items() == other.items()
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def _index(self, handler):
+        try:
+            return self._handlers.index(handler)
+        except ValueError:
+            raise KeyError(handler)
+
+    def get(self, handler, default=None):
+        return self[handler] if handler in self else default
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        if self._buckets is None:
+            return [DEFAULT_HANDLER_OPTIONS] * len(self._handlers) if self._options is None else list(self._options)
+        return [options for priority in self._priorities for options in self._buckets[-priority].values()]
+
+    def items(self):
+        if self._buckets is None:
+            return list(zip(self._handlers, self.values()))
+        return [item for priority in self._priorities for item in self._buckets[-priority].items()]
+
+    def copy(self):
+        return self.__class__(self.items())
+
+    def add(self, handler, options=None):
+        """
+        Binds the handler. Given options replace options of already bound handler.
+        """
+        if handler in self:
+            if options is None:
+                return
+            if self[handler].priority == options.priority:
+                self._replace(handler, options)
+                self._changed()
+                return
+            self.remove(handler)
+        options = options or DEFAULT_HANDLER_OPTIONS
+        if self._buckets is None and (options.priority or len(self._handlers) >= self.SMALL_SIZE):
+            self._to_buckets()
+        if self._buckets is None:
+            if self._options is None and options is not DEFAULT_HANDLER_OPTIONS:
+                self._options = [DEFAULT_HANDLER_OPTIONS] * len(self._handlers)
+            # short lists are copied to not keep spare capacity
+            self._handlers = self._handlers + [handler]
+            if self._options is not None:
+                self._options = self._options + [options]
+        else:
+            self._options[handler] = options
+            self._bucket(options.priority)[handler] = options
+        self._changed()
+
+    append = add
+
+    def extend(self, handlers, options=None):
+        for handler in handlers:
+            if isinstance(handler, tuple):
+                self.add(*handler)  # (handler, options) pair
+            else:
+                self.add(handler, options)
+
+    def remove(self, handler):
+        if self._buckets is None:
+            index = self._index(handler)
+            del self._handlers[index]
+            if self._options is not None:
+                del self._options[index]
+                if all(options is DEFAULT_HANDLER_OPTIONS for options in self._options):
+                    self._options = None
+        else:
+            priority = self._options.pop(handler).priority
+            bucket = self._buckets[priority]
+            del bucket[handler]
+            if not bucket:
+                del self._buckets[priority]
+                self._priorities.remove(-priority)
+        self._changed()
+
+    def discard(self, handler):
+        if handler in self:
+            self.remove(handler)
+
+    def pop(self, handler, *default):
+        if handler not in self and default:
+            return default[0]
+        options = self[handler]
+        self.remove(handler)
+        return options
+
+    def clear(self):
+        self._handlers = []
+        self._options = self._buckets = self._priorities = None
+        self._changed()
+
+    def _replace(self, handler, options):
+        if self._buckets is not None:
+            self._options[handler] = options
+            self._buckets[options.priority][handler] = options
+            return
+        if self._options is None:
+            self._options = [DEFAULT_HANDLER_OPTIONS] * len(self._handlers)
+        self._options[self._index(handler)] = options
+
+    def _to_buckets(self):
+        # handlers are too many or have priorities to be kept in a list
+        items = self.items()
+        self._handlers = None
+        self._options = {}
+        self._buckets = {}
+        self._priorities = []
+        for handler, options in items:  # all of default priority
+            self._options[handler] = options
+            self._bucket(0)[handler] = options
+
+    def _bucket(self, priority):
+        bucket = self._buckets.get(priority)
+        if bucket is None:
+            self._buckets[priority] = bucket = ordered_dict()
+            if not self._priorities or self._priorities[-1] < -priority:
+                self._priorities.append(-priority)
+            else:
+                self._priorities.insert(bisect_right(self._priorities, -priority), -priority)
+        return bucket
+
+    def _changed(self):
+        registry = self._registry and self._registry()
+        if registry is not None:
+            registry._changed()
+
+
+class WeakHandler(object):
+    """
+    Weak reference to a handler, calls the handler while it's alive.
+    Bound methods are referenced by their instances.
+    Equals to the referenced handler, so it can be unbound by the handler itself.
+    """
+
+    __slots__ = ('_ref', '_func', '_hash', '__weakref__')
+
+    def __init__(self, handler, on_dead=None):
+        self_ref = weakref.ref(self)
+
+        def dead(_):
+            weak_handler = self_ref()
+            if weak_handler is not None and on_dead is not None:
+                on_dead(weak_handler)
+
+        instance = getattr(handler, '__self__', None)
+        func = getattr(handler, '__func__', None)
+        if instance is not None and func is not None:
+            self._ref = weakref.ref(instance, dead)
+            self._func = func
+        else:
+            self._ref = weakref.ref(handler, dead)
+            self._func = None
+        self._hash = hash(handler)
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.resolve())
+
+    def resolve(self):
+        """
+        Returns the handler or None if it's dead
+        """
+        target = self._ref()
+        if target is None or self._func is None:
+            return target
+        return types.MethodType(self._func, target)
+
+    def __call__(self, *args, **kwargs):
+        handler = self.resolve()
+        if handler is not None:
+            return handler(*args, **kwargs)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if isinstance(other, WeakHandler):
+            other = other.resolve()
+        handler = self.resolve()
+        return handler is not None and handler == other
+
+    def __ne__(self, other):
+        return not self == other
+
+
+class Plan(tuple):
+    """
+    Resolved handlers to call for a trigger.
+    Options of the handlers are kept in the same order in `options`.
+    """
+
+    def __new__(cls, handlers=(), options=()):
+        plan = super(Plan, cls).__new__(cls, handlers)
+        plan.options = tuple(options)
+        return plan
+
+
+class Emitter(object):
+    """
+    Fires an event with fixed options (see Events.emitter).
+    Keeps the dispatch plan until the registry is changed.
+    """
+
+    __slots__ = ('registry', 'event', 'unique_call', 'call_order', 'propagate', '_plan', '_generation')
+
+    def __init__(self, registry, event, unique_call, call_order, propagate):
+        self.registry = registry
+        self.event = event
+        self.unique_call = unique_call
+        self.call_order = call_order
+        self.propagate = propagate
+        self._plan = None
+        self._generation = None
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.event)
+
+    def plan(self):
+        registry = self.registry
+        if self._generation != registry._generation:
+            self._generation = registry._generation
+            self._plan = registry._get_plan(self.event, self.unique_call, self.call_order, self.propagate)
+        return self._plan
+
+    def __call__(self, *args, **kwargs):
+        registry = self.registry
+        plan = self._plan if self._generation == registry._generation else self.plan()
+        if registry._policies:
+            options = registry.options(unique_call=self.unique_call, call_order=self.call_order,
+                                       propagate=self.propagate)
+            events = registry._throttle(self.event, args, dict(kwargs, **options))
+            if events is not self.event:
+                plan = registry._get_plan(events, self.unique_call, self.call_order, self.propagate)
+        else:
+            events = self.event
+        if registry._histories:
+            registry._record(events, args, kwargs)
+        if registry._instrumentation is not None:
+            return registry._instrumentation.run(registry._events_key(self.event), plan, args, kwargs)
+        return registry._call_plan(plan, args, kwargs)
+
+
+class CompactHandlers(object):
+    """
+    Handlers of an event kept in tuples (a single handler is kept as is).
+    Uses less memory than Handlers, but binding and unbinding take O(n).
+    Options are kept only if some handler has not default options.
+    """
+
+    __slots__ = ('_handlers', '_options', '_registry')
+
+    def __init__(self, handlers=()):
+        self._handlers = ()
+        self._options = None
+        self._registry = None
+        self.extend(handlers)
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, list(self))
+
+    def __reduce__(self):
+        return self.__class__, (list(self.items()),)
+
+    def __iter__(self):
+        return iter(self._tuple())
+
+    def __len__(self):
+        return len(self._tuple())
+
+    def __contains__(self, handler):
+        return handler in self._tuple()
+
+    def __getitem__(self, handler):
+        return self.values()[self._tuple().index(handler)]
+
+    def __eq__(self, other):
+        if isinstance(other, CompactHandlers):
+            return self.items() == other.items()
+        return NotImplemented
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def values(self):
+        return self._options or (DEFAULT_HANDLER_OPTIONS,) * len(self)
+
+    def items(self):
+        return list(zip(self._tuple(), self.values()))
+
+    def copy(self):
+        return self.__class__(self.items())
+
+    def add(self, handler, options=None):
+        """
+        Binds the handler. Given options replace options of already bound handler.
+        """
+        handlers = self._tuple()
+        if handler in handlers:
+            if options is None:
+                return
+            index = handlers.index(handler)
+            if self.values()[index].priority == options.priority:
+                values = list(self.values())
+                values[index] = options
+                self._set_options(values)
+                self._changed()
+                return
+            self.remove(handler)
+            handlers = self._tuple()
+        options = options or DEFAULT_HANDLER_OPTIONS
+        if self._options is None and options is DEFAULT_HANDLER_OPTIONS:
+            self._set_handlers(handlers + (handler,))
+        else:
+            values = self.values()
+            index = priority_index(values, options.priority)
+            self._set_handlers(handlers[:index] + (handler,) + handlers[index:])
+            self._set_options(values[:index] + (options,) + values[index:])
+        self._changed()
+
+    append = add
+
+    def extend(self, handlers, options=None):
+        for handler in handlers:
+            if isinstance(handler, tuple):
+                self.add(*handler)  # (handler, options) pair
+            else:
+                self.add(handler, options)
+
+    def remove(self, handler):
+        handlers = self._tuple()
+        index = handlers.index(handler)
+        values = self.values()
+        self._set_handlers(handlers[:index] + handlers[index + 1:])
+        self._set_options(values[:index] + values[index + 1:])
+        self._changed()
+
+    def discard(self, handler):
+        if handler in self._tuple():
+            self.remove(handler)
+
+    def _tuple(self):
+        handlers = self._handlers
+        return handlers if isinstance(handlers, tuple) else (handlers,)
+
+    def _set_handlers(self, handlers):
+        # handlers are never tuples (see extend), so a single one is kept without a tuple
+        self._handlers = handlers[0] if len(handlers) == 1 else handlers
+
+    def _set_options(self, values):
+        values = tuple(values)
+        self._options = values if any(v is not DEFAULT_HANDLER_OPTIONS for v in values) else None
+
+    def _changed(self):
+        registry = self._registry and self._registry()
+        if registry is not None:
+            registry._changed()
+
+
+class FrozenHandlers(CompactHandlers):
+    """
+    Handlers which can't be changed after creation (see FrozenEvents)
+    """
+
+    __slots__ = ()
+
+    def __init__(self, handlers=()):
+        compact = CompactHandlers(handlers)
+        self._handlers, self._options, self._registry = compact._handlers, compact._options, None
+
+    def _immutable(self, *args, **kwargs):
+        raise TypeError("{} can't be changed".format(self.__class__.__name__))
+
+    add = append = extend = remove = discard = _immutable
+
+
+ABANDONED = object()
+
+
+class GatheredResults(object):
+    """
+    Results of handlers which are run concurrently, kept in the order of handlers.
+    When a handler stops propagation, results of the next handlers are dropped.
+    """
+
+    def __init__(self, size):
+        self.results = [None] * size
+        self.finished = [False] * size
+        self.stop = size  # index of the handler which stopped propagation
+        self._first_unfinished = 0
+
+    def add(self, index, result):
+        self.results[index] = result
+        self.finished[index] = True
+
+    def add_stop(self, index, stop):
+        self.add(index, stop)
+        self.stop = min(self.stop, index)
+
+    def add_abandoned(self, index):
+        # handler is out of time budget, its result is dropped
+        self.add(index, ABANDONED)
+
+    def is_pending(self, index):
+        return not self.finished[index] and index <= self.stop
+
+    def is_complete(self):
+        """
+        Whether all handlers up to the one which stopped propagation are finished
+        """
+        while self._first_unfinished < self.stop and self.finished[self._first_unfinished]:
+            self._first_unfinished += 1
+        return self._first_unfinished >= self.stop
+
+    def value(self):
+        results = [result for result in self.results[:self.stop] if result is not ABANDONED]
+        if self.stop < len(self.results) and self.results[self.stop].has_result:
+            results.append(self.results[self.stop].result)
+        return results
+
+
+class WildCardPattern(object):
+    """
+    Wild card event compiled into a program of segments (without regular expressions).
+
+    If wild cards take whole segments, the pattern is matched segment by segment:
+    literal segments are compared by equality, '~' takes one non-empty segment,
+    '*' takes one or more segments (at least one symbol).
+    Otherwise (like 'app:log*') it's matched symbol by symbol:
+    '~' takes 1+ symbols except the delimiter, '*' takes 1+ any symbols.
+    """
+
+    __slots__ = ('pattern', 'delimiter', 'wild_card', 'soft_wild_card', 'segments', 'tokens')
+
+    def __init__(self, pattern, delimiter, wild_card, soft_wild_card):
+        self.pattern = pattern
+        self.delimiter = delimiter
+        self.wild_card = wild_card
+        self.soft_wild_card = soft_wild_card
+        segments = pattern.split(delimiter)
+        if any(segment not in (wild_card, soft_wild_card) and (wild_card in segment or soft_wild_card in segment)
+               for segment in segments):
+            self.segments = None
+            self.tokens = self._tokenize(pattern)
+        else:
+            self.segments = tuple(segments)
+            self.tokens = None
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.pattern)
+
+    def _tokenize(self, pattern):
+        # literals and wild cards (as separate tokens)
+        tokens = []
+        literal = []
+        for symbol in pattern:
+            if symbol == self.wild_card or symbol == self.soft_wild_card:
+                if literal:
+                    tokens.append(''.join(literal))
+                    literal = []
+                tokens.append(symbol)
+            else:
+                literal.append(symbol)
+        if literal:
+            tokens.append(''.join(literal))
+        return tuple(tokens)
+
+    def match(self, name):
+        if self.segments is not None:
+            return self._match_segments(name.split(self.delimiter))
+        return self._match_symbols(name)
+
+    def _match_segments(self, segments):
+        program = self.segments
+        size = len(segments)
+        visited = set()
+        states = [(0, 0)]
+        while states:
+            state = states.pop()
+            if state in visited:
+                continue
+            visited.add(state)
+            i, j = state
+            if i == len(program):
+                if j == size:
+                    return True
+                continue
+            if j == size:
+                continue
+            segment = program[i]
+            if segment == self.wild_card:
+                # at least one symbol: one non-empty segment or several segments
+                start = j + 1 if segments[j] else j + 2
+                states.extend((i + 1, k) for k in range(start, size + 1))
+            elif segment == self.soft_wild_card:
+                if segments[j]:
+                    states.append((i + 1, j + 1))
+            elif segment == segments[j]:
+                states.append((i + 1, j + 1))
+        return False
+
+    def _match_symbols(self, name):
+        tokens = self.tokens
+        first, last = tokens[0], tokens[-1]
+        if (first not in (self.wild_card, self.soft_wild_card) and not name.startswith(first) or
+                last not in (self.wild_card, self.soft_wild_card) and not name.endswith(last)):
+            return False
+        size = len(name)
+        visited = set()
+        states = [(0, 0)]
+        while states:
+            state = states.pop()
+            if state in visited:
+                continue
+            visited.add(state)
+            i, position = state
+            if i == len(tokens):
+                if position == size:
+                    return True
+                continue
+            token = tokens[i]
+            if token == self.wild_card:
+                states.extend((i + 1, end) for end in range(position + 1, size + 1))
+            elif token == self.soft_wild_card:
+                end = name.find(self.delimiter, position)
+                end = size if end < 0 else end
+                states.extend((i + 1, k) for k in range(position + 1, end + 1))
+            elif name.startswith(token, position):
+                states.append((i + 1, position + len(token)))
+        return False
+
+
+class EventsTreeNode(object):
+    """
+    Node of the events tree.
+    Keeps child nodes by name segment and the full event name
+    if such event is registered.
+    """
+
+    __slots__ = ('children', 'event')
+
+    def __init__(self):
+        self.children = None  # most of nodes are leaves, so children are created with the first child
+        self.event = None
+
+    def child(self, segment):
+        return self.children.get(segment) if self.children else None
+
+
+class EventsTree(object):
+    """
+    Segment trie over registered event names.
+    Allows to find parents and children of an event
+    without scanning all registered events.
+    """
+
+    def __init__(self, delimiter):
+        self.delimiter = delimiter
+        self.root = EventsTreeNode()
+
+    def _find(self, event):
+        node = self.root
+        for segment in event.split(self.delimiter):
+            node = node.child(segment)
+            if node is None:
+                break
+        return node
+
+    def add(self, event):
+        node = self.root
+        for segment in event.split(self.delimiter):
+            child = node.child(segment)
+            if child is None:
+                if node.children is None:
+                    node.children = {}
+                node.children[intern_name(segment)] = child = EventsTreeNode()
+            node = child
+        node.event = event
+
+    def remove(self, event):
+        path = []
+        node = self.root
+        for segment in event.split(self.delimiter):
+            path.append((node, segment))
+            node = node.child(segment)
+            if node is None:
+                return
+        node.event = None
+        # drop branches without registered events
+        while path and node.event is None and not node.children:
+            node, segment = path.pop()
+            del node.children[segment]
+            if not node.children:
+                node.children = None
+
+    def clear(self):
+        self.root = EventsTreeNode()
+
+    def ancestors(self, event):
+        """
+        Registered parent events (e.g. 'r' and 'r:a' for 'r:a:aa')
+        """
+        events = []
+        node = self.root
+        for segment in event.split(self.delimiter)[:-1]:
+            node = node.child(segment)
+            if node is None:
+                break
+            if node.event is not None:
+                events.append(node.event)
+        return events
+
+    def descendants(self, event):
+        """
+        Registered child events on all levels (e.g. 'r:a' and 'r:a:aa' for 'r')
+        """
+        events = []
+        node = self._find(event)
+        if node is not None and node.children:
+            nodes = list(node.children.values())
+            while nodes:
+                node = nodes.pop()
+                if node.event is not None:
+                    events.append(node.event)
+                if node.children:
+                    nodes.extend(node.children.values())
+        return events
+
+    def matching(self, pattern):
+        """
+        Registered events which match the wild card pattern (with wild cards in whole segments only)
+        """
+        events = []
+        program = pattern.segments
+        visited = set()
+        # (node, index of pattern segment, whether '*' takes more segments)
+        states = [(self.root, 0, False)]
+        while states:
+            node, i, more = states.pop()
+            if (id(node), i, more) in visited:
+                continue
+            visited.add((id(node), i, more))
+            if i == len(program):
+                if node.event is not None:
+                    events.append(node.event)
+                continue
+            if not node.children:
+                continue
+            segment = program[i]
+            if more:
+                # '*' has taken several segments, so it has at least one symbol
+                for child in node.children.values():
+                    states.append((child, i + 1, False))
+                    states.append((child, i, True))
+            elif segment == pattern.wild_card:
+                for name, child in node.children.items():
+                    if name:
+                        states.append((child, i + 1, False))
+                    states.append((child, i, True))
+            elif segment == pattern.soft_wild_card:
+                states.extend((child, i + 1, False) for name, child in node.children.items() if name)
+            else:
+                child = node.child(segment)
+                if child is not None:
+                    states.append((child, i + 1, False))
+        return events
+
+
+class WildCardsTreeNode(object):
+    """
+    Node of the wild cards tree.
+    Keeps child nodes for literal segments, '~' and '*' segments
+    and the wild card events which end on this node.
+    """
+
+    __slots__ = ('children', 'soft_wild_card', 'wild_card', 'events')
+
+    def __init__(self):
+        self.children = {}
+        self.soft_wild_card = None
+        self.wild_card = None
+        self.events = set()
+
+    def is_empty(self):
+        return not (self.children or self.soft_wild_card or self.wild_card or self.events)
+
+
+class WildCardsTree(object):
+    """
+    Index of registered wild card events.
+    Matches a concrete event name segment by segment, so only
+    wild card events which can match the name are touched.
+
+    Segments consisting only of '~' or '*' are matched on the segments level:
+    '~' is one non-empty segment, '*' is one or more segments.
+    Events with wild cards inside of a segment (like 'app:log*')
+    are matched one by one with patterns compiled once they are added (see WildCardPattern).
+    """
+
+    def __init__(self, delimiter, wild_card, soft_wild_card):
+        self.delimiter = delimiter
+        self.wild_card = wild_card
+        self.soft_wild_card = soft_wild_card
+        self.root = WildCardsTreeNode()
+        self.complex_events = {}  # event -> WildCardPattern
+
+    def _is_complex(self, segments):
+        return any(segment not in (self.wild_card, self.soft_wild_card) and
+                   (self.wild_card in segment or self.soft_wild_card in segment)
+                   for segment in segments)
+
+    def _child(self, node, segment, create=False):
+        if segment == self.wild_card:
+            child = node.wild_card
+            if child is None and create:
+                node.wild_card = child = WildCardsTreeNode()
+        elif segment == self.soft_wild_card:
+            child = node.soft_wild_card
+            if child is None and create:
+                node.soft_wild_card = child = WildCardsTreeNode()
+        else:
+            child = node.children.get(segment)
+            if child is None and create:
+                node.children[intern_name(segment)] = child = WildCardsTreeNode()
+        return child
+
+    def add(self, event):
+        segments = event.split(self.delimiter)
+        if self._is_complex(segments):
+            if event not in self.complex_events:
+                self.complex_events[event] = WildCardPattern(
+                    event, self.delimiter, self.wild_card, self.soft_wild_card)
+            return
+        node = self.root
+        for segment in segments:
+            node = self._child(node, segment, create=True)
+        node.events.add(event)
+
+    def remove(self, event):
+        segments = event.split(self.delimiter)
+        if self._is_complex(segments):
+            self.complex_events.pop(event, None)
+            return
+        path = []
+        node = self.root
+        for segment in segments:
+            path.append((node, segment))
+            node = self._child(node, segment)
+            if node is None:
+                return
+        node.events.discard(event)
+        # drop branches without wild card events
+        while path and node.is_empty():
+            node, segment = path.pop()
+            if segment == self.wild_card:
+                node.wild_card = None
+            elif segment == self.soft_wild_card:
+                node.soft_wild_card = None
+            else:
+                del node.children[segment]
+
+    def clear(self):
+        self.root = WildCardsTreeNode()
+        self.complex_events.clear()
+
+    def match(self, event):
+        """
+        Returns wild card events which match the event name
+        """
+        matched = set(e for e, pattern in self.complex_events.items() if pattern.match(event))
+        segments = event.split(self.delimiter)
+        size = len(segments)
+        visited = set()
+        states = [(self.root, 0)]
+        while states:
+            state = states.pop()
+            node, i = state
+            if (id(node), i) in visited:
+                continue
+            visited.add((id(node), i))
+            if i == size:
+                matched.update(node.events)
+                continue
+            child = node.children.get(segments[i])
+            if child is not None:
+                states.append((child, i + 1))
+            if node.soft_wild_card is not None and segments[i]:
+                states.append((node.soft_wild_card, i + 1))
+            if node.wild_card is not None:
+                # '*' takes one or more segments, but at least one symbol
+                start = i + 1 if segments[i] else i + 2
+                states.extend((node.wild_card, j) for j in range(start, size + 1))
+        return matched
 
 
 class Events(dict):
@@ -65,22 +1112,115 @@ class Events(dict):
     # To avoid mix kwarg arguments
     KWARGS_PREFIX = 'event_opt_'
 
+    # Container of handlers of an event
+    handlers_class = Handlers
+
+    # Max number of cached dispatch plans
+    PLANS_CACHE_SIZE = 1024
+
+    # Max number of cached compiled patterns of wild card events
+    RE_CACHE_SIZE = 256
+
+    # Max number of threads used by trigger_threaded (None means executor default)
+    THREAD_POOL_SIZE = None
+
+    # Max number of processes used for cpu bound handlers (None means number of CPUs)
+    PROCESS_POOL_SIZE = None
+
     def __init__(self, *args, **kwargs):
-        super(Events, self).__init__(*args, **kwargs)
-        self._re_cache = {}
+        super(Events, self).__init__()
+        self._re_cache = LRUCache(self.RE_CACHE_SIZE)
+        self._generation = 0
+        self._plans = OrderedDict()
+        self._plans_generation = 0
+        self._plans_hits = self._plans_misses = 0
+        self._pools_lock = threading.Lock()
+        self._thread_pool = None
+        self._process_pool = None
+        self._watchdog = None
+        self._instrumentation = None
+        self._dead_handlers = []
+        self._policies = OrderedDict()
+        self._policies_cache = {}
+        self._histories = OrderedDict()
+        self._histories_cache = {}
+        self._records_counter = count()
+        self._tree = EventsTree(self.DELIMITER)
+        self._wild_cards = WildCardsTree(self.DELIMITER, self.WILD_CARD, self.SOFT_WILD_CARD)
+        self.update(*args, **kwargs)
+
+    def __reduce__(self):
+        # runtime state (locks, pools, caches, indexes) is built again from registered events
+        return self.__class__, (dict(self),)
+
+    def __copy__(self):
+        return self.__class__(dict(self))  # handlers are copied by __setitem__
+
+    # Keep the events indexes in sync with registered events
+
+    def _changed(self):
+        # invalidates cached dispatch plans
+        self._generation += 1
+
+    def _event_added(self, event):
+        self._tree.add(event)
+        if self._is_re(event):
+            self._wild_cards.add(event)
+
+    def _event_removed(self, event):
+        self._tree.remove(event)
+        if self._is_re(event):
+            self._wild_cards.remove(event)
+        self._changed()
+
+    def __setitem__(self, event, handlers):
+        if not isinstance(handlers, self.handlers_class):
+            handlers = self.handlers_class(handlers)
+        elif handlers._registry is not None and handlers._registry() is not self:
+            handlers = handlers.copy()  # handlers of another registry
+        handlers._registry = weakref.ref(self)  # changes of handlers invalidate plans
+        if event not in self:
+            self._event_added(event)
+        super(Events, self).__setitem__(event, handlers)
+        self._changed()
+
+    def __delitem__(self, event):
+        super(Events, self).__delitem__(event)
+        self._event_removed(event)
+
+    def setdefault(self, event, handlers=None):
+        if event not in self:
+            self[event] = handlers
+        return self[event]
+
+    def update(self, *args, **kwargs):
+        for event, handlers in dict(*args, **kwargs).items():
+            self[event] = handlers
+
+    def pop(self, event, *default):
+        if event in self:
+            self._event_removed(event)
+        return super(Events, self).pop(event, *default)
+
+    def popitem(self):
+        event, handlers = super(Events, self).popitem()
+        self._event_removed(event)
+        return event, handlers
+
+    def clear(self):
+        super(Events, self).clear()
+        self._tree.clear()
+        self._wild_cards.clear()
+        self._changed()
 
     def _generate_events(self, event_name, events_scope=ES_PROPAGATE_DEFAULT):
         events = []
 
         if events_scope & self.ES_PROPAGATE_TO_TOP:
-            event = event_name
-            while self.DELIMITER in event:
-                event = event.rpartition(self.DELIMITER)[0]
-                events.append(event)
+            events.extend(self._tree.ancestors(event_name))
 
         if events_scope & self.ES_PROPAGATE_TO_DEEP:
-            event = event_name + self.DELIMITER
-            events.extend(e for e in self if e.startswith(event))
+            events.extend(self._tree.descendants(event_name))
 
         events.sort()
 
@@ -89,21 +1229,40 @@ class Events(dict):
 
         return events
 
-    def _get_handlers(self, event_name, call_order=CO_DEFAULT, events_scope=ES_PROPAGATE_DEFAULT):
+    def _get_events(self, event_name, call_order=CO_DEFAULT, events_scope=ES_PROPAGATE_DEFAULT):
         events = self._generate_events(event_name, events_scope=events_scope)
         if call_order == self.CO_FROM_THE_BEGIN:
             events.sort()
         elif call_order == self.CO_FROM_THE_END:
             events.sort(reverse=True)
+        return events
+
+    def _get_handlers(self, event_name, call_order=CO_DEFAULT, events_scope=ES_PROPAGATE_DEFAULT):
+        events = self._get_events(event_name, call_order=call_order, events_scope=events_scope)
         return chain(*[self.get(event, []) for event in events])
 
-    def _generate_re(self, event_name):
-        re_cached = self._re_cache.get(event_name)
-        if re_cached is None:
-            safe = '.+'.join(re.escape(event_name).split('\\'+self.WILD_CARD))
-            safe = '[^{}]+'.format(self.DELIMITER).join(safe.split('\\' + self.SOFT_WILD_CARD))
-            self._re_cache[event_name] = re_cached = re.compile(r'^{safe}$'.format(safe=safe), re.UNICODE)
-        return re_cached
+    def _compile_pattern(self, event_name):
+        pattern = self._re_cache.get(event_name)
+        if pattern is None:
+            pattern = WildCardPattern(event_name, self.DELIMITER, self.WILD_CARD, self.SOFT_WILD_CARD)
+            self._re_cache.set(event_name, pattern)
+        return pattern
+
+    def warm_re_cache(self, events):
+        """
+        Compiles patterns of wild card events in advance
+        """
+        events = [events] if isinstance(events, basestring) else events
+        for event in events:
+            event = event.strip()
+            if self._is_re(event) and event not in self._re_cache:
+                self._compile_pattern(event)
+
+    def re_cache_info(self):
+        """
+        Statistics of the compiled wild card patterns cache
+        """
+        return self._re_cache.info()
 
     def _is_re(self, event_name):
         return self.WILD_CARD in event_name or self.SOFT_WILD_CARD in event_name
@@ -116,13 +1275,13 @@ class Events(dict):
             event = event.strip()
             matched = []
             if self._is_re(event):
-                matcher = self._generate_re(event)
-                matched.extend(filter(matcher.match, self))
+                pattern = self._compile_pattern(event)
+                if pattern.segments is not None:
+                    matched.extend(self._tree.matching(pattern))
+                else:
+                    matched.extend(filter(pattern.match, self))
             # check reverse matching
-            matched.extend(
-                filter(lambda self_event: self._is_re(self_event) and self._generate_re(self_event).match(event),
-                       self)
-            )
+            matched.extend(self._wild_cards.match(event))
 
             prepared_events.extend(sorted(matched))
             prepared_events.append(event)
@@ -141,56 +1300,987 @@ class Events(dict):
         """
         return dict((self.KWARGS_PREFIX + k, v) for k, v in kwargs.items())
 
-    def trigger(self, events, *args, **kwargs):
+    def _build_plan(self, events, unique_call, call_order, propagate):
+        events = self._prepare_events(events)
+        get_events_func = partial(
+            self._get_events,
+            call_order=call_order,
+            events_scope=propagate
+        )
+        handlers = []
+        options = []
+        executed = set()
+        for event in chain(*map(get_events_func, events)):
+            for handler, handler_options in self.get(event, self.handlers_class()).items():
+                if handler not in executed or unique_call == self.TB_CALL_EVERY:
+                    executed.add(handler)
+                    handlers.append(handler)
+                    options.append(handler_options)
+        if any(o.priority for o in options):
+            # merges handlers of all levels by priority,
+            # handlers of the same priority are kept in the call order of levels
+            order = sorted(range(len(options)), key=lambda i: -options[i].priority)
+            handlers = [handlers[i] for i in order]
+            options = [options[i] for i in order]
+        return Plan(handlers, options)
+
+    def _events_key(self, events):
+        return events if isinstance(events, basestring) else tuple(events or ())
+
+    def _plan_key(self, events, unique_call, call_order, propagate):
+        return self._events_key(events), unique_call, call_order, propagate
+
+    def _get_plan(self, events, unique_call, call_order, propagate):
         """
-        Important: options should be passed with KWARGS_PREFIX in name.
-        It helps to avoid mixing of same arguments in bind functions.
+        Returns handlers to call for the trigger options.
+        Plans are cached until the next change of registered events.
+        """
+        events = self._events_key(events)  # iterators of events are consumed once
+        key = self._plan_key(events, unique_call, call_order, propagate)
+        if self._plans_generation == self._generation:
+            plan = self._plans.get(key)
+            if plan is not None:
+                self._plans_hits += 1
+                return plan
+
+        self._remove_dead_handlers()
+        if self._plans_generation != self._generation:
+            self._plans = OrderedDict()
+            self._plans_generation = self._generation
+
+        self._plans_misses += 1
+        plan = self._build_plan(events, unique_call, call_order, propagate)
+        if len(self._plans) >= self.PLANS_CACHE_SIZE:
+            self._plans.popitem(last=False)
+        self._plans[key] = plan
+        return plan
+
+    def memory_report(self):
         """
+        Memory (in bytes) used by the registry structures.
+        Handlers themselves aren't counted, shared objects are counted once.
+        """
+        seen = set()
+        report = OrderedDict([
+            ('registry', sys.getsizeof(self) + sum(deep_sizeof(event, seen) for event in self)),
+            ('handlers', sum(deep_sizeof(handlers, seen) for handlers in self.values())),
+            ('events_tree', deep_sizeof(self._tree, seen)),
+            ('wild_cards_tree', deep_sizeof(self._wild_cards, seen)),
+            ('plans', deep_sizeof(self._plans, seen)),
+            ('re_cache', deep_sizeof(self._re_cache, seen)),
+        ])
+        report['total'] = sum(report.values())
+        return report
+
+    def plans_info(self):
+        """
+        Statistics of the dispatch plans cache
+        """
+        return PlansInfo(self._plans_hits, self._plans_misses, self.PLANS_CACHE_SIZE, len(self._plans))
+
+    def _trigger_plan(self, events, args, kwargs, trigger=None, trigger_kwargs=None):
+        # pops trigger options from kwargs,
+        # `trigger` with `trigger_kwargs` (all options of the trigger) fire deferred triggers of policies
+        if self._policies and trigger_kwargs is None:
+            trigger_kwargs = dict(kwargs)
+        if self._option(kwargs, 'throttle', True) and self._policies:
+            events = self._throttle(events, args, trigger_kwargs, trigger)
         unique_call = self._option(kwargs, 'unique_call', self.TB_DEFAULT)
         call_order = self._option(kwargs, 'call_order', self.CO_DEFAULT)
         propagate = self._option(kwargs, 'propagate', self.ES_PROPAGATE_DEFAULT)
+        if self._histories:
+            self._record(events, args, kwargs)
+        return self._get_plan(events, unique_call, call_order, propagate)
 
-        events = self._prepare_events(events)
-        get_handlers_func = partial(
-            self._get_handlers,
-            call_order=call_order,
-            events_scope=propagate
-        )
-        executed = []
+    def trigger(self, events, *args, **kwargs):
+        """
+        Important: options should be passed with KWARGS_PREFIX in name.
+        It helps to avoid mixing of same arguments in bind functions.
+
+        Option `budget` limits time (seconds) of the trigger:
+        once it's spent, the rest of handlers bound with `optional=True` are skipped.
+        """
+        trigger_kwargs = dict(kwargs) if self._policies else None
+        budget = self._option(kwargs, 'budget')
+        events = self._events_key(events)  # iterators of events are consumed once
+        plan = self._trigger_plan(events, args, kwargs, self.trigger, trigger_kwargs)
+        if budget is not None:
+            plan = self._within_budget(self._events_key(events), plan, budget)
+        if self._instrumentation is not None:
+            return self._instrumentation.run(self._events_key(events), plan, args, kwargs)
+        return self._call_plan(plan, args, kwargs)
+
+    def throttle(self, event_or_events, policy):
+        """
+        Attaches a throttling policy (see eevent.throttling) to events, wild card events
+        or parents of events: triggers which aren't admitted by the policy are dropped
+        before handlers are resolved. Policies are checked by all triggers, except of the ones
+        with `throttle=False` option.
+        Deferred triggers of policies (e.g. trailing triggers of Debounce) keep the arguments
+        and options of the throttled trigger and are made by the same method
+        (trigger_async ones - in the loop of the throttled trigger, their results are dropped),
+        lazy and batch triggers are deferred as `trigger`.
+        """
+        policies = OrderedDict(self._policies)
+        for event in [event_or_events] if isinstance(event_or_events, basestring) else event_or_events:
+            event = event.strip()
+            policies[event] = policies.get(event, ()) + (policy,)
+        self._policies = policies
+        self._policies_cache = {}
+
+    def unthrottle(self, events=None, policy=None):
+        """
+        Detaches the policy (all policies by default) from events (from all events by default)
+        """
+        policies = OrderedDict(self._policies)
+        targets = list(policies) if events is None else [
+            event.strip() for event in ([events] if isinstance(events, basestring) else events)]
+        for event in targets:
+            kept = tuple(p for p in policies.get(event, ()) if policy is not None and p is not policy)
+            if kept:
+                policies[event] = kept
+            else:
+                policies.pop(event, None)
+        self._policies = policies
+        self._policies_cache = {}
+
+    def _attached(self, table, cache, event):
+        # objects attached to the event, its parents and wild card events matching it
+        attached = cache.get(event)
+        if attached is None:
+            attached = []
+            segments = event.split(self.DELIMITER)
+            for end in range(len(segments), 0, -1):
+                attached.extend(table.get(self.DELIMITER.join(segments[:end]), ()))
+            for pattern, pattern_attached in table.items():
+                if pattern != event and self._is_re(pattern) and self._compile_pattern(pattern).match(event):
+                    attached.extend(pattern_attached)
+            if len(cache) >= self.PLANS_CACHE_SIZE:
+                cache.clear()
+            cache[event] = attached = tuple(attached)
+        return attached
+
+    def _throttle(self, events, args, kwargs, trigger=None):
+        # returns the triggered events which are admitted by policies,
+        # kwargs (with trigger options) are kept for deferred triggers of policies
+        if isinstance(events, basestring):
+            return events if self._admit(events, args, kwargs, trigger) else ()
+        admitted = tuple(event for event in events if self._admit(event, args, kwargs, trigger))
+        return admitted if len(admitted) < len(events) else events
+
+    def _admit(self, event, args, kwargs, trigger=None):
+        policies = self._attached(self._policies, self._policies_cache, event)
+        if not policies:
+            return True
+        fire = partial(self._fire, trigger or self.trigger, event, args, kwargs)
+        return all(policy.admit(event, fire) for policy in policies)
+
+    def _fire(self, trigger, event, args, kwargs):
+        # deferred trigger of a policy, made by the same method as the throttled one
+        trigger(event, *args, **dict(kwargs, **self.options(throttle=False)))
+
+    def _fire_async(self, loop, event, *args, **kwargs):
+        # deferred trigger_async is made in the loop of the throttled one
+        loop.call_soon_threadsafe(partial(self.trigger_async, event, *args, **dict(kwargs, **self.options(loop=loop))))
+
+    def record(self, event_or_events, max_count=100, max_bytes=None, **kwargs):
+        """
+        Starts recording of triggers of events, wild card events or parents of events
+        into a ring buffer (see eevent.history.History), returns the buffer.
+        Recorded triggers are replayed to handlers bound with `replay` option.
+        """
+        history = History(max_count, max_bytes, **kwargs)
+        histories = OrderedDict(self._histories)
+        for event in [event_or_events] if isinstance(event_or_events, basestring) else event_or_events:
+            event = event.strip()
+            histories[event] = histories.get(event, ()) + (history,)
+        self._histories = histories
+        self._histories_cache = {}
+        return history
+
+    def unrecord(self, events=None):
+        """
+        Stops recording of events (of all events by default), drops their records
+        """
+        histories = OrderedDict(self._histories)
+        targets = list(histories) if events is None else [
+            event.strip() for event in ([events] if isinstance(events, basestring) else events)]
+        for event in targets:
+            histories.pop(event, None)
+        self._histories = histories
+        self._histories_cache = {}
+
+    def _record(self, events, args, kwargs):
+        for event in [events] if isinstance(events, basestring) else (events or ()):
+            histories = self._attached(self._histories, self._histories_cache, event)
+            if histories:
+                record = Record(next(self._records_counter), event, args, dict(kwargs))
+                for history in histories:
+                    history.add(record)
+
+    def _receives(self, bound_event, event):
+        # whether handlers of the bound event are called by triggers of the event (with default options)
+        return (bound_event == event or event.startswith(bound_event + self.DELIMITER) or
+                self._is_re(bound_event) and self._compile_pattern(bound_event).match(event) or
+                self._is_re(event) and self._compile_pattern(event).match(bound_event))
+
+    def _replay(self, bound_events, handlers, replay):
+        records = {}
+        for histories in self._histories.values():
+            for history in histories:
+                for record in history.records():
+                    records[record.number] = record
+        matched = [records[number] for number in sorted(records)
+                   if any(self._receives(bound_event, records[number].event) for bound_event in bound_events)]
+        for record in matched[-replay:]:
+            try:
+                for handler in handlers:
+                    handler(*record.args, **record.kwargs)
+            except StopPropagation:
+                pass  # stops handlers of the record as in a trigger
+
+    def budget_exceeded(self, events, handler, budget):
+        """
+        Called when a handler is skipped, cancelled or abandoned
+        because of the time budget (seconds) of the handler or of the trigger.
+        Does nothing by default.
+        """
+
+    def _within_budget(self, events, plan, budget):
+        # handlers of the plan as they are called, optional ones are skipped once the budget is spent
+        started = default_timer()
+        for handler, options in zip(plan, plan.options):
+            if options.optional and default_timer() - started >= budget:
+                self.budget_exceeded(events, handler, budget)
+            else:
+                yield handler
+
+    def emitter(self, event, unique_call=TB_DEFAULT, call_order=CO_DEFAULT, propagate=ES_PROPAGATE_DEFAULT):
+        """
+        Returns a callable which fires the event(s) with the given options:
+            emit = e.emitter('r:a', propagate=e.ES_PROPAGATE_CURRENT)
+            emit(*args, **kwargs)  # like e.trigger('r:a', *args, **dict(kwargs, **e.options(...)))
+        The emitter resolves handlers again only after changes of the registry.
+        """
+        return Emitter(self, event if isinstance(event, basestring) else tuple(event),
+                       unique_call, call_order, propagate)
+
+    def _call_plan(self, plan, args, kwargs):
         results = []
-        for handler in chain(*map(get_handlers_func, events)):
-            if handler not in executed or unique_call == self.TB_CALL_EVERY:
+        try:
+            for handler in plan:
                 results.append(handler(*args, **kwargs))
-                executed.append(handler)
+        except StopPropagation as stop:
+            if stop.has_result:
+                results.append(stop.result)
         return results
 
-    def on(self, event_or_events, handler_or_handlers):
+    def _iter_plan(self, plan, args, kwargs):
+        try:
+            for handler in plan:
+                yield handler(*args, **kwargs)
+        except StopPropagation as stop:
+            if stop.has_result:
+                yield stop.result
+
+    def trigger_iter(self, events, *args, **kwargs):
+        """
+        Fires events lazily: returns an iterator which calls handlers as results are consumed,
+        so handlers after the last consumed result are not called.
+        """
+        events = self._events_key(events)
+        plan = self._trigger_plan(events, args, kwargs)
+        if self._instrumentation is not None:
+            return self._instrumentation.iterate(self._events_key(events), plan, args, kwargs)
+        return self._iter_plan(plan, args, kwargs)
+
+    def trigger_first(self, events, *args, **kwargs):
+        """
+        Calls handlers until one of them returns not None result, returns that result.
+        """
+        for result in self.trigger_iter(events, *args, **kwargs):
+            if result is not None:
+                return result
+
+    def trigger_any(self, events, *args, **kwargs):
+        """
+        Calls handlers until one of them returns true result, returns whether it was returned.
+        """
+        return any(self.trigger_iter(events, *args, **kwargs))
+
+    def notify(self, events, *args, **kwargs):
+        """
+        Fires events ignoring results of handlers (results are not collected).
+        """
+        events = self._events_key(events)
+        plan = self._trigger_plan(events, args, kwargs)
+        if self._instrumentation is not None:
+            self._instrumentation.run(self._events_key(events), plan, args, kwargs)
+            return
+        try:
+            for handler in plan:
+                handler(*args, **kwargs)
+        except StopPropagation:
+            pass
+
+    def instrument(self, instrumentation=None, **kwargs):
+        """
+        Enables timings of `trigger`, `trigger_many` and `notify` calls
+        (`trigger_iter` records timings of handlers only).
+        Accepts Instrumentation or its arguments, returns used Instrumentation.
+        """
+        self._instrumentation = instrumentation or Instrumentation(**kwargs)
+        return self._instrumentation
+
+    def uninstrument(self):
+        """
+        Disables timings, returns used Instrumentation
+        """
+        instrumentation, self._instrumentation = self._instrumentation, None
+        return instrumentation
+
+    def trigger_many(self, triggers, **kwargs):
+        """
+        Fires a batch of events given as (events, args, kwargs) items.
+        Yields handlers results for every item, items are consumed lazily.
+        Options are passed once for the whole batch (with KWARGS_PREFIX in name),
+        handlers of every distinct event are resolved once per batch.
+        """
+        unique_call = self._option(kwargs, 'unique_call', self.TB_DEFAULT)
+        call_order = self._option(kwargs, 'call_order', self.CO_DEFAULT)
+        propagate = self._option(kwargs, 'propagate', self.ES_PROPAGATE_DEFAULT)
+        options = self.options(unique_call=unique_call, call_order=call_order, propagate=propagate)
+
+        plans = {}
+        generation = self._generation
+        for events, args, kw in triggers:
+            events = self._events_key(events)
+            if generation != self._generation:
+                # handlers changed the registry
+                plans.clear()
+                generation = self._generation
+            if self._policies:
+                events = self._throttle(events, args, dict(kw, **options))
+            if self._histories:
+                self._record(events, args, kw)
+            key = events
+            plan = plans.get(key)
+            if plan is None:
+                plans[key] = plan = self._get_plan(events, unique_call, call_order, propagate)
+            if self._instrumentation is not None:
+                yield self._instrumentation.run(key, plan, args, kw)
+            else:
+                yield self._call_plan(plan, args, kw)
+
+    def freeze(self, call_orders=(CO_DEFAULT,), propagations=(ES_PROPAGATE_DEFAULT,)):
+        """
+        Returns an immutable copy of the registry with precompiled dispatch plans
+        of every registered event for every given call order and propagation (see FrozenEvents).
+        The copy is an instance of FrozenEvents subclass of the registry class (see frozen_class),
+        weak handlers can't be frozen (ValueError).
+        """
+        frozen = frozen_class(self.__class__)(self.items(), call_orders=call_orders, propagations=propagations)
+        for name in ('PLANS_CACHE_SIZE', 'budget_exceeded'):
+            if name in self.__dict__:  # overridden by the instance
+                setattr(frozen, name, self.__dict__[name])
+        return frozen
+
+    def deferred(self, **kwargs):
+        """
+        Returns a queue of deferred triggers which coalesces duplicate triggers
+        and fires them in one batch on flush (see DeferredEvents for arguments)
+        """
+        return DeferredEvents(self, **kwargs)
+
+    def trigger_async(self, events, *args, **kwargs):
+        """
+        Fires events inside of asyncio event loop.
+        Returns a future of handlers results (in the same order as `trigger` returns them).
+
+        Coroutine handlers are awaited concurrently, plain handlers are called inline
+        or in an executor, handlers bound with `cpu_bound=True` are run in the process pool.
+        Additional options (with KWARGS_PREFIX in name):
+            loop - event loop (current event loop by default)
+            executor - executor for plain handlers (True means default executor of the loop)
+            concurrency - max number of handlers which are run at the same time
+            budget - time (seconds) of the trigger, handlers which aren't finished in time
+                are cancelled (or abandoned if they can't be cancelled) and their results are dropped
+        Handlers bound with `timeout` are cancelled the same way when they run longer.
+        """
+        if asyncio is None:
+            raise RuntimeError('trigger_async requires asyncio')
+
+        trigger_kwargs = dict(kwargs) if self._policies else None
+        loop = self._option(kwargs, 'loop') or asyncio.get_event_loop()
+        executor = self._option(kwargs, 'executor')
+        concurrency = self._option(kwargs, 'concurrency')
+        budget = self._option(kwargs, 'budget')
+
+        events = self._events_key(events)
+        plan = self._trigger_plan(events, args, kwargs, partial(self._fire_async, loop), trigger_kwargs)
+        return self._run_async(loop, plan, args, kwargs, executor, concurrency, budget, self._events_key(events))
+
+    def trigger_threaded(self, events, *args, **kwargs):
+        """
+        Fires events in the thread pool of the instance.
+        Returns a future of handlers results (in the same order as `trigger` returns them).
+
+        Handlers are submitted to the pool in the call order (CO_* options),
+        so a single thread runs them in the same order as `trigger`;
+        several threads start them in that order, but they can finish in any order.
+        Handlers bound with `cpu_bound=True` are submitted to the process pool.
+        If a handler fails, not started handlers are cancelled.
+
+        Option `budget` limits time (seconds) of the trigger, handlers bound with `timeout`
+        are limited by it as well (counting from the trigger). Handlers out of time are cancelled
+        or abandoned (if they are running already) and their results are dropped.
+        """
+        if futures is None:
+            raise RuntimeError('trigger_threaded requires concurrent.futures (futures package on python 2)')
+
+        trigger_kwargs = dict(kwargs) if self._policies else None
+        budget = self._option(kwargs, 'budget')
+        events = self._events_key(events)
+        plan = self._trigger_plan(events, args, kwargs, self.trigger_threaded, trigger_kwargs)
+        deadlines = self._deadlines(plan, budget)
+        return self._gather_futures([
+            self._get_pool(options).submit(handler, *args, **kwargs)
+            for handler, options in zip(plan, plan.options)
+        ], deadlines, partial(self._handlers_expired, self._events_key(events), plan, deadlines))
+
+    def _deadlines(self, plan, budget):
+        # time budget of every handler of the plan
+        deadlines = []
+        for options in plan.options:
+            limits = [limit for limit in (options.timeout, budget) if limit is not None]
+            deadlines.append(min(limits) if limits else None)
+        return deadlines
+
+    def _handlers_expired(self, events, plan, deadlines, indexes):
+        for index in indexes:
+            self.budget_exceeded(events, plan[index], deadlines[index])
+
+    def _get_thread_pool(self):
+        with self._pools_lock:
+            if self._thread_pool is None:
+                self._thread_pool = futures.ThreadPoolExecutor(self.THREAD_POOL_SIZE)
+            return self._thread_pool
+
+    def _get_process_pool(self):
+        with self._pools_lock:
+            if self._process_pool is None:
+                self._process_pool = futures.ProcessPoolExecutor(self.PROCESS_POOL_SIZE)
+            return self._process_pool
+
+    def _get_pool(self, options):
+        return self._get_process_pool() if options.cpu_bound else self._get_thread_pool()
+
+    def _get_watchdog(self):
+        with self._pools_lock:
+            if self._watchdog is None:
+                self._watchdog = Watchdog()
+            return self._watchdog
+
+    def shutdown(self, wait=True):
+        """
+        Stops pools used by trigger_threaded and for cpu bound handlers
+        and the thread which expires time budgets of trigger_threaded
+        """
+        with self._pools_lock:
+            pools = self._thread_pool, self._process_pool
+            watchdog = self._watchdog
+            self._thread_pool = self._process_pool = self._watchdog = None
+        for pool in pools:
+            if pool is not None:
+                pool.shutdown(wait)
+        if watchdog is not None:
+            watchdog.stop()
+
+    def _gather_futures(self, handler_futures, deadlines=(), expired=None):
+        done = futures.Future()
+        gathered = GatheredResults(len(handler_futures))
+        lock = threading.Lock()
+
+        def finished(index, future):
+            cancel_from = None
+            with lock:
+                if done.done() or not gathered.is_pending(index):
+                    return
+                error = None if future.cancelled() else future.exception()
+                if future.cancelled():
+                    done.cancel()
+                    cancel_from = 0
+                elif isinstance(error, StopPropagation):
+                    gathered.add_stop(index, error)
+                    cancel_from = index + 1
+                elif error is not None:
+                    done.set_exception(error)
+                    cancel_from = 0
+                else:
+                    gathered.add(index, future.result())
+                if not done.done() and gathered.is_complete():
+                    done.set_result(gathered.value())
+            # stops the rest of handlers on failure or stop of propagation
+            if cancel_from is not None:
+                for handler_future in handler_futures[cancel_from:]:
+                    handler_future.cancel()
+
+        def expire(indexes):
+            with lock:
+                if done.done():
+                    return
+                indexes = [index for index in indexes if gathered.is_pending(index)]
+                for index in indexes:
+                    gathered.add_abandoned(index)
+                if gathered.is_complete():
+                    done.set_result(gathered.value())
+            for index in indexes:
+                handler_futures[index].cancel()
+            if indexes and expired is not None:
+                expired(indexes)
+
+        by_deadline = {}
+        for index, deadline in enumerate(deadlines):
+            if deadline is not None:
+                by_deadline.setdefault(deadline, []).append(index)
+
+        if not handler_futures:
+            done.set_result([])
+        for index, future in enumerate(handler_futures):
+            future.add_done_callback(partial(finished, index))
+        if by_deadline and not done.done():
+            # deadlines are expired by the single thread of the instance
+            watchdog = self._get_watchdog()
+            entries = [watchdog.call_later(deadline, expire, indexes) for deadline, indexes in by_deadline.items()]
+            done.add_done_callback(lambda _: [watchdog.cancel(entry) for entry in entries])
+        return done
+
+    def _start_async(self, loop, handler, options, args, kwargs, executor):
+        if options.cpu_bound:
+            return loop.run_in_executor(self._get_process_pool(), partial(handler, *args, **kwargs))
+        if executor is not None and not asyncio.iscoroutinefunction(handler):
+            return self._await_result(loop, loop.run_in_executor(None if executor is True else executor,
+                                                                 partial(handler, *args, **kwargs)))
+        future = loop.create_future()
+        try:
+            result = handler(*args, **kwargs)
+        except Exception as e:
+            future.set_exception(e)
+        else:
+            if inspect.isawaitable(result):
+                return asyncio.ensure_future(result, loop=loop)
+            future.set_result(result)
+        return future
+
+    def _await_result(self, loop, future):
+        # plain handlers can return awaitable objects as well
+        result_future = loop.create_future()
+
+        def resolved(future):
+            if result_future.done():
+                return
+            if future.cancelled():
+                result_future.cancel()
+            elif future.exception() is not None:
+                result_future.set_exception(future.exception())
+            elif inspect.isawaitable(future.result()):
+                asyncio.ensure_future(future.result(), loop=loop).add_done_callback(resolved)
+            else:
+                result_future.set_result(future.result())
+
+        future.add_done_callback(resolved)
+        return result_future
+
+    def _run_async(self, loop, plan, args, kwargs, executor=None, concurrency=None, budget=None, events=None):
+        done = loop.create_future()
+        gathered = GatheredResults(len(plan))
+        started = []
+        timers = []
+        state = {'next': 0, 'running': 0}
+        max_running = concurrency or len(plan)
+
+        def start_next():
+            index = state['next']
+            state['next'] += 1
+            if gathered.finished[index]:
+                return  # abandoned before the start
+            state['running'] += 1
+            future = self._start_async(loop, plan[index], plan.options[index], args, kwargs, executor)
+            started.append((index, future))
+            future.add_done_callback(partial(finished, index))
+            timeout = plan.options[index].timeout
+            if timeout is not None and not future.done():
+                timers.append(loop.call_later(timeout, expire, [index], timeout))
+
+        def complete_or_continue():
+            if gathered.is_complete():
+                done.set_result(gathered.value())
+                return
+            while state['next'] < gathered.stop and state['running'] < max_running:
+                start_next()
+
+        def finished(index, future):
+            if done.done() or not gathered.is_pending(index):
+                return
+            if future.cancelled():
+                done.cancel()
+                return
+            error = future.exception()
+            state['running'] -= 1
+            if isinstance(error, StopPropagation):
+                gathered.add_stop(index, error)
+                for started_index, handler_future in started:
+                    if started_index > index:
+                        handler_future.cancel()
+            elif error is not None:
+                done.set_exception(error)
+                return
+            else:
+                gathered.add(index, future.result())
+            complete_or_continue()
+
+        def expire(indexes, limit):
+            if done.done():
+                return
+            indexes = [index for index in indexes if gathered.is_pending(index)]
+            for index in indexes:
+                gathered.add_abandoned(index)
+            expired = set(indexes)
+            for index, future in started:
+                if index in expired:
+                    state['running'] -= 1
+                    future.cancel()
+            for index in indexes:
+                self.budget_exceeded(events, plan[index], limit)
+            complete_or_continue()
+
+        def cancel_started(_):
+            # stops the rest of handlers on failure or cancellation
+            for _, future in started:
+                future.cancel()
+            for timer in timers:
+                timer.cancel()
+
+        done.add_done_callback(cancel_started)
+        if budget is not None:
+            timers.append(loop.call_later(budget, expire, list(range(len(plan))), budget))
+        complete_or_continue()
+        return done
+
+    def _bind(self, event_or_events, handler_or_handlers, options=None, weak=False):
+        self._remove_dead_handlers()
         events = self._prepare_events(event_or_events)
         handlers = self._prepare_handlers(handler_or_handlers)
+        if options is not None and options.cpu_bound:
+            if weak:
+                raise ValueError("CPU bound handlers can't be weak")
+            for handler in handlers:
+                self._check_picklable(handler)
         for event in events:
-            hs = self.setdefault(event, [])
-            hs.extend(filter(lambda h: h not in hs, handlers))
+            hs = self._changing_handlers(event)
+            if weak:
+                hs.extend([self._weak_handler(event, handler) for handler in handlers], options)
+            else:
+                hs.extend(handlers, options)
 
-    def off(self, events=None, handlers=None):
+    def _weak_handler(self, event, handler):
+        events_ref = weakref.ref(self)
+
+        def dead(weak_handler):
+            events = events_ref()
+            if events is not None:
+                events._handler_died(event, weak_handler)
+
+        return WeakHandler(handler, dead)
+
+    def _handler_died(self, event, weak_handler):
+        # can be called by garbage collector in the middle of anything,
+        # so the handler is removed on the next change or resolving of handlers
+        self._dead_handlers.append((event, weak_handler))
+        self._changed()
+
+    def _remove_dead_handlers(self):
+        while self._dead_handlers:
+            event, weak_handler = self._dead_handlers.pop()
+            hs = self.get(event)
+            if hs is not None and weak_handler in hs:
+                hs = self._changing_handlers(event)
+                hs.discard(weak_handler)
+                if not hs:
+                    self.pop(event, None)
+
+    def _changing_handlers(self, event):
+        """
+        Returns handlers of the event to change (registers the event if needed)
+        """
+        hs = self.get(event)
+        if hs is None:
+            self[event] = hs = self.handlers_class()
+        return hs
+
+    def _check_picklable(self, handler):
+        try:
+            pickle.dumps(handler, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            raise TypeError('CPU bound handler {!r} must be picklable'.format(handler))
+
+    def _unbind(self, events=None, handlers=None):
+        self._remove_dead_handlers()
         if events is None and handlers is None:
             self.clear() # unbind all events
         elif handlers is None:
-            events = self._prepare_events(events)
-            map(lambda e: self.pop(e, None), events) # unbind custom events
+            for event in self._prepare_events(events):
+                self.pop(event, None) # unbind custom events
         else:
-            target_events = self.keys() if events is None else filter(lambda e: e in self, self._prepare_events(events))
+            target_events = list(self) if events is None else [e for e in self._prepare_events(events) if e in self]
             target_handlers = self._prepare_handlers(handlers)
-            for hs in map(self.get, target_events):
-                map(hs.remove, filter(lambda h: h in hs, target_handlers)) #unbind handlers
-            map(lambda e: self.pop(e, None), filter(lambda e: not self.get(e), target_events))
+            for event in target_events:
+                hs = self._changing_handlers(event)
+                for handler in target_handlers:
+                    hs.discard(handler) # unbind handlers
+                if not hs:
+                    self.pop(event, None)
+
+    def on(self, event_or_events, handler_or_handlers, cpu_bound=False, weak=False, priority=0,
+           timeout=None, optional=False, replay=0):
+        """
+        Binds handlers to events.
+        `replay` - number of the last recorded triggers (see `record`) to deliver to the handlers
+        right after binding (triggers which would call the handlers with default options).
+        `timeout` limits time (seconds) of handlers in trigger_threaded and trigger_async,
+        `optional` handlers are skipped by triggers which have spent their `budget` option.
+        Handlers with higher `priority` are called first (across all levels of triggered events),
+        handlers of the same priority are called in `call_order`.
+        Handlers with `cpu_bound=True` are run in a process pool by trigger_threaded
+        and trigger_async, so they must be picklable (checked here).
+        Handlers with `weak=True` are referenced weakly (bound methods - by their instances)
+        and are unbound automatically when they are garbage collected.
+        """
+        if cpu_bound or priority or timeout is not None or optional:
+            options = HandlerOptions(cpu_bound=cpu_bound, priority=priority, timeout=timeout, optional=optional)
+        else:
+            options = None
+        self._bind(event_or_events, handler_or_handlers, options, weak)
+        self._changed()
+        if replay:
+            self._replay(self._prepare_events(event_or_events), self._prepare_handlers(handler_or_handlers), replay)
+
+    def off(self, events=None, handlers=None):
+        self._unbind(events, handlers)
+        self._changed()
+
+    def on_many(self, bindings):
+        """
+        Binds a batch of handlers.
+        Accepts a dict or pairs of (event_or_events, handler_or_handlers).
+        """
+        if isinstance(bindings, dict):
+            bindings = bindings.items()
+        for event_or_events, handler_or_handlers in bindings:
+            self._bind(event_or_events, handler_or_handlers)
+        self._changed()
+
+    def off_many(self, bindings):
+        """
+        Unbinds a batch of handlers.
+        Accepts a dict or pairs of (events, handlers), handlers can be None to unbind the whole events.
+        """
+        if isinstance(bindings, dict):
+            bindings = bindings.items()
+        for events, handlers in bindings:
+            self._unbind(events, handlers)
+        self._changed()
+
+def locked(method):
+    """
+    Runs the method under the lock of the instance
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class ThreadSafeEvents(Events):
+    """
+    Events which can be changed and fired from several threads.
+
+    Changes are made under a lock: handlers of an event are copied
+    before they are changed (copy on write) and a new table of dispatch plans
+    is published. Triggers read published plans without locking,
+    only resolving of a new plan takes the lock.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._lock = threading.RLock()
+        super(ThreadSafeEvents, self).__init__(*args, **kwargs)
+
+    def _changed(self):
+        super(ThreadSafeEvents, self)._changed()
+        self._plans = OrderedDict()
+        self._plans_generation = self._generation
+
+    def _changing_handlers(self, event):
+        # handlers which can be iterated right now are never changed
+        self[event] = hs = self.handlers_class(self.get(event, self.handlers_class()).items())
+        return hs
+
+    def _get_plan(self, events, unique_call, call_order, propagate):
+        plan = self._plans.get(self._plan_key(events, unique_call, call_order, propagate))
+        if plan is not None:
+            self._plans_hits += 1
+            return plan
+        with self._lock:
+            return super(ThreadSafeEvents, self)._get_plan(events, unique_call, call_order, propagate)
+
+    __setitem__ = locked(Events.__setitem__)
+    __delitem__ = locked(Events.__delitem__)
+    setdefault = locked(Events.setdefault)
+    update = locked(Events.update)
+    pop = locked(Events.pop)
+    popitem = locked(Events.popitem)
+    clear = locked(Events.clear)
+    on = locked(Events.on)
+    off = locked(Events.off)
+    on_many = locked(Events.on_many)
+    off_many = locked(Events.off_many)
+    warm_re_cache = locked(Events.warm_re_cache)
+    throttle = locked(Events.throttle)
+    unthrottle = locked(Events.unthrottle)
+    record = locked(Events.record)
+    unrecord = locked(Events.unrecord)
+    freeze = locked(Events.freeze)
+    __reduce__ = locked(Events.__reduce__)
+    __copy__ = locked(Events.__copy__)
+
+
+class CompactEvents(Events):
+    """
+    Events which use less memory for large registries:
+    names are interned (shared with the segments of events tree)
+    and handlers are kept in tuples (see CompactHandlers).
+    Handlers take less memory than in plain lists, but the events tree
+    makes the registry about twice as large as a plain dict of lists.
+    """
+
+    handlers_class = CompactHandlers
+
+    def __setitem__(self, event, handlers):
+        super(CompactEvents, self).__setitem__(intern_name(event), handlers)
+
+
+def immutable(method):
+    """
+    Rejects calls of the method when the instance is frozen,
+    otherwise calls the method of the next class after FrozenEvents (see frozen_class)
+    """
+    name = method.__name__
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._frozen:
+            raise TypeError("{} can't be changed".format(self.__class__.__name__))
+        return getattr(super(FrozenEvents, self), name)(*args, **kwargs)
+    return wrapper
+
+
+class FrozenEvents(Events):
+    """
+    Events which can't be changed after creation.
+
+    Dispatch plans of registered events (including wild card ones) are compiled
+    in advance for every given call order and propagation,
+    so triggering of them with default options is a single dict lookup.
+    Plans of other triggers (e.g. events matched only by wild cards) are resolved once
+    and kept in the plans cache.
+    Handlers can't be weak, since plans aren't changed when they die,
+    and are kept in FrozenHandlers.
+    """
+
+    handlers_class = FrozenHandlers
+
+    def __init__(self, *args, **kwargs):
+        call_orders = kwargs.pop('call_orders', (self.CO_DEFAULT,))
+        propagations = kwargs.pop('propagations', (self.ES_PROPAGATE_DEFAULT,))
+        self._frozen = False
+        handlers = dict(
+            (event, self.handlers_class(handlers.items() if hasattr(handlers, 'items') else handlers))
+            for event, handlers in dict(*args, **kwargs).items())
+        for event, hs in handlers.items():
+            if any(isinstance(handler, WeakHandler) for handler in hs):
+                raise ValueError("Handlers of {!r} can't be weak in {}".format(event, self.__class__.__name__))
+        super(FrozenEvents, self).__init__(handlers)
+
+        self._table = {}
+        self._default_table = {}
+        compiled = {}  # equal plans are shared
+        for event in self:
+            for call_order in call_orders:
+                for propagate in propagations:
+                    plan = self._build_plan(event, self.TB_DEFAULT, call_order, propagate)
+                    plan = compiled.setdefault((tuple(plan), plan.options), plan)
+                    self._table[self._plan_key(event, self.TB_DEFAULT, call_order, propagate)] = plan
+                    if call_order == self.CO_DEFAULT and propagate == self.ES_PROPAGATE_DEFAULT:
+                        self._default_table[event] = plan
+        self._frozen = True
+
+    def _get_plan(self, events, unique_call, call_order, propagate):
+        plan = self._table.get(self._plan_key(events, unique_call, call_order, propagate))
+        if plan is not None:
+            return plan
+        return super(FrozenEvents, self)._get_plan(events, unique_call, call_order, propagate)
+
+    def trigger(self, events, *args, **kwargs):
+        if (self._instrumentation is None and not self._policies and not self._histories and
+                not (kwargs and any(k.startswith(self.KWARGS_PREFIX) for k in kwargs))):
+            try:
+                plan = self._default_table.get(events)
+            except TypeError:  # list of events
+                plan = None
+            if plan is not None:
+                return self._call_plan(plan, args, kwargs)
+        return super(FrozenEvents, self).trigger(events, *args, **kwargs)
+
+    __setitem__ = immutable(Events.__setitem__)
+    __delitem__ = immutable(Events.__delitem__)
+    setdefault = immutable(Events.setdefault)
+    update = immutable(Events.update)
+    pop = immutable(Events.pop)
+    popitem = immutable(Events.popitem)
+    clear = immutable(Events.clear)
+    on = immutable(Events.on)
+    off = immutable(Events.off)
+    on_many = immutable(Events.on_many)
+    off_many = immutable(Events.off_many)
+
+
+_frozen_classes = {}
+
+
+def frozen_class(cls):
+    """
+    Returns FrozenEvents subclass of the Events subclass,
+    which keeps its configuration (DELIMITER, WILD_CARD, handlers_class, overridden methods, etc.)
+    """
+    if issubclass(cls, FrozenEvents):
+        return cls
+    if cls is Events:
+        return FrozenEvents
+    frozen = _frozen_classes.get(cls)
+    if frozen is None:
+        frozen = type(str('Frozen' + cls.__name__), (FrozenEvents, cls), {'__module__': cls.__module__})
+        _frozen_classes[cls] = frozen
+    return frozen
 
 
 # Registers common app events
 app_events = Events()
 trigger = app_events.trigger
+trigger_async = app_events.trigger_async
 on = app_events.on
 off = app_events.off
 opts = app_events.options
 
 
-__all__ = ['Events', 'app_events', 'trigger', 'on', 'off', 'opts']
\ No newline at end of file
+__all__ = ['Events', 'ThreadSafeEvents', 'CompactEvents', 'FrozenEvents', 'DeferredEvents', 'Emitter', 'StopPropagation', 'app_events', 'trigger', 'trigger_async', 'on', 'off', 'opts']
\ No newline at end of file
@@ -0,0 +1,20 @@
+# coding=utf-8
+"""
+Exceptions which control events triggering
+"""
+
+
+class StopPropagation(Exception):
+    """
+    Raised by a handler to skip the rest of handlers (and levels of events) of the trigger.
+    The result (if it's given) is added to results of the trigger.
+
+    Example:
+        >>> def handler(*args, **kwargs):
+        ...     raise StopPropagation('handled')
+    """
+
+    def __init__(self, *result):
+        super(StopPropagation, self).__init__(*result)
+        self.has_result = bool(result)
+        self.result = result[0] if result else None
@@ -0,0 +1,69 @@
+# coding=utf-8
+"""
+Bounded history of triggers (see Events.record)
+"""
+
+import sys
+import threading
+from collections import deque, namedtuple
+
+
+Record = namedtuple('Record', 'number event args kwargs')
+
+
+def payload_size(args, kwargs):
+    """
+    Approximate size (in bytes) of arguments of a trigger (sizes of containers and their items)
+    """
+    return (sys.getsizeof(args) + sum(sys.getsizeof(arg) for arg in args) +
+            sys.getsizeof(kwargs) + sum(sys.getsizeof(value) for value in kwargs.values()))
+
+
+class History(object):
+    """
+    Ring buffer of the last triggers: keeps at most `max_count` records
+    and records of at most `max_bytes` size of arguments (measured by `sizeof(args, kwargs)`),
+    older records are dropped.
+    """
+
+    def __init__(self, max_count=100, max_bytes=None, sizeof=payload_size):
+        self.max_count = max_count
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.bytes = 0
+        self._records = deque(maxlen=max_count)
+        self._sizes = deque(maxlen=max_count)
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '{}(max_count={!r}, max_bytes={!r})'.format(self.__class__.__name__, self.max_count, self.max_bytes)
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, record):
+        size = self.sizeof(record.args, record.kwargs) if self.max_bytes is not None else 0
+        with self._lock:
+            if self.max_count == 0 or self.max_bytes is not None and size > self.max_bytes:
+                return  # never fits
+            if len(self._records) == self.max_count:
+                self.bytes -= self._sizes[0]  # dropped by append
+            self._records.append(record)
+            self._sizes.append(size)
+            self.bytes += size
+            while self.max_bytes is not None and self.bytes > self.max_bytes:
+                self._records.popleft()
+                self.bytes -= self._sizes.popleft()
+
+    def records(self):
+        """
+        Records from the oldest to the newest
+        """
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+            self._sizes.clear()
+            self.bytes = 0
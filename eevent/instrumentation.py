@@ -0,0 +1,143 @@
+# coding=utf-8
+"""
+Timings of events triggering
+"""
+
+import threading
+from bisect import bisect_left
+from timeit import default_timer
+
+from eevent.exceptions import StopPropagation
+
+
+class TimingStats(object):
+    """
+    Calls count, cumulative and max duration and histogram of durations.
+    histogram[i] counts durations <= bounds[i], the last item counts the rest.
+    """
+
+    __slots__ = ('bounds', 'count', 'total', 'max', 'histogram')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * (len(bounds) + 1)
+
+    def add(self, duration):
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        self.histogram[bisect_left(self.bounds, duration)] += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'total': self.total,
+            'mean': self.mean,
+            'max': self.max,
+            'histogram': list(zip(list(self.bounds) + [None], self.histogram)),
+        }
+
+
+class Instrumentation(object):
+    """
+    Collects timings of triggers (per event) and of handlers.
+
+    Hooks:
+        pre_trigger(events, args, kwargs) - called before handlers
+        post_trigger(events, results, duration) - called after handlers
+        on_slow_handler(events, handler, duration) - called when a handler runs longer
+            than `slow_threshold` seconds
+    """
+
+    # Upper bounds of histogram buckets (seconds)
+    HISTOGRAM_BOUNDS = (0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0)
+
+    def __init__(self, slow_threshold=None, on_slow_handler=None, pre_trigger=None, post_trigger=None,
+                 histogram_bounds=HISTOGRAM_BOUNDS):
+        self.slow_threshold = slow_threshold
+        self.on_slow_handler = on_slow_handler
+        self.pre_trigger = pre_trigger
+        self.post_trigger = post_trigger
+        self.histogram_bounds = tuple(sorted(histogram_bounds))
+        self.events = {}
+        self.handlers = {}
+        self._lock = threading.Lock()
+
+    def _add(self, stats, key, duration):
+        with self._lock:
+            timing = stats.get(key)
+            if timing is None:
+                stats[key] = timing = TimingStats(self.histogram_bounds)
+            timing.add(duration)
+
+    def run(self, events, plan, args, kwargs):
+        """
+        Calls handlers of the plan measuring their timings.
+        `events` is a hashable key of triggered events (a name or a tuple of names).
+        """
+        if self.pre_trigger is not None:
+            self.pre_trigger(events, args, kwargs)
+
+        results = []
+        started = default_timer()
+        try:
+            for handler in plan:
+                handler_started = default_timer()
+                try:
+                    results.append(handler(*args, **kwargs))
+                finally:
+                    self.handler_done(events, handler, default_timer() - handler_started)
+        except StopPropagation as stop:
+            if stop.has_result:
+                results.append(stop.result)
+        finally:
+            duration = default_timer() - started
+            self._add(self.events, events, duration)
+
+        if self.post_trigger is not None:
+            self.post_trigger(events, results, duration)
+        return results
+
+    def iterate(self, events, plan, args, kwargs):
+        """
+        Calls handlers of the plan lazily measuring their timings
+        """
+        for handler in plan:
+            started = default_timer()
+            try:
+                result = handler(*args, **kwargs)
+            except StopPropagation as stop:
+                if stop.has_result:
+                    yield stop.result
+                return
+            finally:
+                self.handler_done(events, handler, default_timer() - started)
+            yield result
+
+    def handler_done(self, events, handler, duration):
+        self._add(self.handlers, handler, duration)
+        if self.slow_threshold is not None and duration > self.slow_threshold and self.on_slow_handler is not None:
+            self.on_slow_handler(events, handler, duration)
+
+    def reset(self):
+        with self._lock:
+            self.events = {}
+            self.handlers = {}
+
+    def report(self):
+        """
+        Collected timings as plain dicts
+        """
+        with self._lock:
+            return {
+                'events': dict((event, timing.as_dict()) for event, timing in self.events.items()),
+                'handlers': dict((repr(handler), timing.as_dict()) for handler, timing in self.handlers.items()),
+            }
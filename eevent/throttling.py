@@ -0,0 +1,156 @@
+# coding=utf-8
+"""
+Throttling policies of triggers (see Events.throttle).
+
+A policy decides whether a trigger of an event is admitted, dropped triggers don't resolve
+and call handlers at all. State of a policy is kept per triggered event
+(so a policy of 'metrics' limits 'metrics:cpu' and 'metrics:memory' separately)
+or is shared by all events of the policy with `shared=True`.
+States of events which weren't triggered for a while are dropped.
+"""
+
+import threading
+from timeit import default_timer
+
+from eevent.watchdog import shared_watchdog
+
+
+class Policy(object):
+    """
+    Base class of throttling policies.
+    Subclasses implement `_admit(state, now, fire)`, where `state` is a dict of the event state
+    and `fire()` triggers the event later (bypassing policies),
+    and `_idle(state, now)` - whether the state admits as a new one (so it can be dropped).
+    """
+
+    MIN_SWEEP_SIZE = 64
+
+    def __init__(self, shared=False):
+        self.shared = shared
+        self._states = {}
+        self._sweep_size = self.MIN_SWEEP_SIZE
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return '{}({})'.format(self.__class__.__name__, ', '.join(
+            '{}={!r}'.format(k, v) for k, v in sorted(self.__dict__.items()) if not k.startswith('_')))
+
+    def admit(self, event, fire=None):
+        """
+        Returns whether the trigger of the event is admitted
+        """
+        key = None if self.shared else event
+        now = default_timer()
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                if len(self._states) >= self._sweep_size:
+                    self._sweep(now)
+                self._states[key] = state = {}
+            return self._admit(state, now, fire)
+
+    def reset(self):
+        with self._lock:
+            self._states.clear()
+            self._sweep_size = self.MIN_SWEEP_SIZE
+
+    def _sweep(self, now):
+        # drops idle states, the next sweep is done when the number of states doubles
+        for key in [key for key, state in self._states.items() if self._idle(state, now)]:
+            del self._states[key]
+        self._sweep_size = max(self.MIN_SWEEP_SIZE, 2 * len(self._states))
+
+    def _admit(self, state, now, fire):
+        raise NotImplementedError
+
+    def _idle(self, state, now):
+        return False
+
+
+class MinInterval(Policy):
+    """
+    Admits a trigger if at least `interval` seconds have passed since the last admitted one
+    """
+
+    def __init__(self, interval, shared=False):
+        super(MinInterval, self).__init__(shared)
+        self.interval = interval
+
+    def _admit(self, state, now, fire):
+        last = state.get('last')
+        if last is not None and now - last < self.interval:
+            return False
+        state['last'] = now
+        return True
+
+    def _idle(self, state, now):
+        return now - state['last'] >= self.interval
+
+
+class TokenBucket(Policy):
+    """
+    Admits `rate` triggers per second on average and bursts of up to `capacity` triggers
+    """
+
+    def __init__(self, rate, capacity=None, shared=False):
+        super(TokenBucket, self).__init__(shared)
+        self.rate = rate
+        self.capacity = max(1, rate) if capacity is None else capacity
+
+    def _admit(self, state, now, fire):
+        tokens = state.get('tokens', self.capacity)
+        last = state.get('last', now)
+        tokens = min(self.capacity, tokens + (now - last) * self.rate)
+        state['last'] = now
+        if tokens < 1:
+            state['tokens'] = tokens
+            return False
+        state['tokens'] = tokens - 1
+        return True
+
+    def _idle(self, state, now):
+        return state['tokens'] + (now - state['last']) * self.rate >= self.capacity
+
+
+class Debounce(Policy):
+    """
+    Collapses bursts of triggers (triggers with pauses shorter than `wait` seconds).
+        leading - the first trigger of a burst is admitted
+        trailing - the last trigger of a burst is fired `wait` seconds after the burst
+            (from the shared watchdog thread) unless it was admitted as the leading one
+    """
+
+    def __init__(self, wait, leading=False, trailing=True, shared=False):
+        super(Debounce, self).__init__(shared)
+        self.wait = wait
+        self.leading = leading
+        self.trailing = trailing
+
+    def _admit(self, state, now, fire):
+        last = state.get('last')
+        state['last'] = now
+        if self.leading and (last is None or now - last >= self.wait):
+            state['pending'] = None
+            return True
+        if self.trailing and fire is not None:
+            state['pending'] = fire
+            if state.get('timer') is None:
+                self._schedule(state, self.wait)
+        return False
+
+    def _idle(self, state, now):
+        return state.get('timer') is None and now - state['last'] >= self.wait
+
+    def _schedule(self, state, delay):
+        state['timer'] = shared_watchdog().call_later(delay, self._expired, state)
+
+    def _expired(self, state):
+        with self._lock:
+            remaining = state['last'] + self.wait - default_timer()
+            if remaining > 0:
+                # the burst goes on
+                self._schedule(state, remaining)
+                return
+            fire, state['pending'], state['timer'] = state.get('pending'), None, None
+        if fire is not None:
+            fire()
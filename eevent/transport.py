@@ -0,0 +1,423 @@
+# coding=utf-8
+"""
+Triggering of events across processes of the same host over Unix domain sockets.
+
+EventsHub listens on a socket path and relays events between connected BusClients.
+Every BusClient subscribes to prefixes of events it has handlers for,
+events are sent only to clients which are subscribed to them
+(and aren't sent by a client at all when nobody is subscribed to them).
+
+Frame format: 4 bytes of payload length (big endian), 1 byte of frame type, payload.
+Prefixes are sent as JSON lists. Events are sent as records:
+4 bytes of name length, 4 bytes of data length, utf-8 name, JSON of [args, kwargs] -
+the hub reads names only and relays records as they are.
+So arguments should be JSON serializable (nested tuples are received as lists).
+The socket is accessible by its owner only.
+
+    hub = EventsHub('/tmp/app-events.sock').start()
+    # in every worker
+    bus = BusClient(events, '/tmp/app-events.sock')
+    bus.trigger('cache:invalidate:user', user_id)  # local handlers + handlers of other workers
+"""
+
+import os
+import stat
+import errno
+import json
+import socket
+import select
+import struct
+import threading
+
+HEADER = struct.Struct('!IB')
+RECORD = struct.Struct('!II')
+
+# Frame types
+FT_EVENTS = 1  # records of events
+FT_SUBSCRIBE = 2  # prefixes of events which a client receives
+FT_INTEREST = 3  # prefixes of events which other clients receive (sent by hub)
+
+DELIMITER = ':'  # default delimiter of events (see Events.DELIMITER)
+
+SOCKET_MODE = 0o600
+
+
+def encode_frame(frame_type, payload):
+    return HEADER.pack(len(payload), frame_type) + payload
+
+
+def encode_prefixes(prefixes):
+    return json.dumps(list(prefixes)).encode('utf-8')
+
+
+def decode_prefixes(payload):
+    return tuple(json.loads(payload.decode('utf-8')))
+
+
+def encode_event(event, args, kwargs):
+    """
+    Returns a record of the event (TypeError/ValueError if arguments aren't JSON serializable)
+    """
+    name = event.encode('utf-8')
+    data = json.dumps([args, kwargs], separators=(',', ':')).encode('utf-8')
+    return RECORD.pack(len(name), len(data)) + name + data
+
+
+def split_events(payload):
+    """
+    Yields (event, record) of records in the payload, data of events isn't decoded
+    """
+    start = 0
+    while start < len(payload):
+        name_size, data_size = RECORD.unpack_from(payload, start)
+        name_end = start + RECORD.size + name_size
+        end = name_end + data_size
+        yield payload[start + RECORD.size:name_end].decode('utf-8'), payload[start:end]
+        start = end
+
+
+def decode_event(record):
+    """
+    Returns (event, args, kwargs) of the record
+    """
+    name_size, _ = RECORD.unpack_from(record)
+    name_end = RECORD.size + name_size
+    args, kwargs = json.loads(record[name_end:].decode('utf-8'))
+    return record[RECORD.size:name_end].decode('utf-8'), tuple(args), kwargs
+
+
+class FrameReader(object):
+    """
+    Splits a stream of bytes into frames
+    """
+
+    def __init__(self):
+        self._buffer = b''
+
+    def feed(self, data):
+        """
+        Returns (frame type, payload) of frames completed by the data
+        """
+        self._buffer += data
+        frames = []
+        while len(self._buffer) >= HEADER.size:
+            size, frame_type = HEADER.unpack_from(self._buffer)
+            end = HEADER.size + size
+            if len(self._buffer) < end:
+                break
+            frames.append((frame_type, self._buffer[HEADER.size:end]))
+            self._buffer = self._buffer[end:]
+        return frames
+
+
+def normalize_prefixes(prefixes, delimiter=DELIMITER):
+    """
+    Returns a sorted tuple of prefixes without the ones covered by shorter prefixes
+    ('' means all events)
+    """
+    result = []
+    for prefix in sorted(set(prefixes)):
+        if not any(prefix == p or not p or prefix.startswith(p + delimiter) for p in result):
+            result.append(prefix)
+    return tuple(result)
+
+
+def registry_prefixes(events):
+    """
+    Prefixes of events which have handlers in the registry.
+    Wild card events are subscribed by their segments before the first wild card
+    (delimiter and wild cards of the registry are used).
+    """
+    wild_cards = (events.WILD_CARD, events.SOFT_WILD_CARD)
+    prefixes = []
+    for event in events:
+        segments = event.split(events.DELIMITER)
+        for index, segment in enumerate(segments):
+            if any(wild_card in segment for wild_card in wild_cards):
+                segments = segments[:index]
+                break
+        prefixes.append(events.DELIMITER.join(segments))
+    return normalize_prefixes(prefixes, events.DELIMITER)
+
+
+class PrefixFilter(object):
+    """
+    Matches an event and its descendants (by the delimiter) for every prefix
+    """
+
+    def __init__(self, prefixes, delimiter=DELIMITER):
+        self.prefixes = normalize_prefixes(prefixes, delimiter)
+        self.match_all = '' in self.prefixes
+        self._exact = frozenset(self.prefixes)
+        self._starts = tuple(prefix + delimiter for prefix in self.prefixes)
+
+    def __call__(self, event):
+        return self.match_all or event in self._exact or event.startswith(self._starts)
+
+
+def _close_socket(sock):
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except socket.error:
+        pass
+    sock.close()
+
+
+def _unlink_socket(path):
+    # removes a socket file left by a previous hub, other files are never removed
+    try:
+        mode = os.stat(path).st_mode
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            return
+        raise
+    if not stat.S_ISSOCK(mode):
+        raise OSError(errno.EEXIST, 'Not a socket', path)
+    os.unlink(path)
+
+
+class EventsHub(object):
+    """
+    Relays events between BusClients connected to the socket path.
+    Clients should use the same delimiter of events as the hub.
+    A socket file at the path (left by a previous hub) is replaced, other files aren't (OSError).
+    Mode of the socket file is `mode` (only the owner can connect by default).
+    """
+
+    def __init__(self, path, delimiter=DELIMITER, mode=SOCKET_MODE):
+        self.path = path
+        self.delimiter = delimiter
+        self.mode = mode
+        self._listener = None
+        self._connections = {}  # socket -> [FrameReader, PrefixFilter, sent interest]
+        self._thread = None
+        self._closing = False
+        self._wakeup = os.pipe()
+
+    def start(self):
+        _unlink_socket(self.path)
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self.path)
+        os.chmod(self.path, self.mode)  # before clients can connect
+        self._listener.listen(64)
+        self._thread = threading.Thread(target=self._serve, name='eevent-hub')
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._closing = True
+        os.write(self._wakeup[1], b'x')
+        if self._thread is not None:
+            self._thread.join()
+        for sock in list(self._connections):
+            _close_socket(sock)
+        self._connections.clear()
+        if self._listener is not None:
+            self._listener.close()
+            try:
+                _unlink_socket(self.path)
+            except OSError:
+                pass  # replaced by another file
+        for fd in self._wakeup:
+            os.close(fd)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _serve(self):
+        while not self._closing:
+            readable, _, _ = select.select([self._listener, self._wakeup[0]] + list(self._connections), [], [])
+            for sock in readable:
+                if sock is self._listener:
+                    conn, _ = self._listener.accept()
+                    self._connections[conn] = [FrameReader(), PrefixFilter((), self.delimiter), None]
+                    self._update_interests()
+                elif sock in self._connections:
+                    self._receive(sock)
+
+    def _receive(self, sock):
+        try:
+            data = sock.recv(65536)
+        except socket.error:
+            data = b''
+        if not data:
+            self._disconnect(sock)
+            return
+        try:
+            for frame_type, payload in self._connections[sock][0].feed(data):
+                if frame_type == FT_EVENTS:
+                    self._relay(sock, payload)
+                elif frame_type == FT_SUBSCRIBE:
+                    self._connections[sock][1] = PrefixFilter(decode_prefixes(payload), self.delimiter)
+                    self._update_interests()
+        except (ValueError, struct.error):
+            self._disconnect(sock)  # malformed frame
+
+    def _disconnect(self, sock):
+        self._connections.pop(sock, None)
+        _close_socket(sock)
+        self._update_interests()
+
+    def _send(self, sock, data):
+        try:
+            sock.sendall(data)
+        except socket.error:
+            self._disconnect(sock)
+
+    def _relay(self, sender, payload):
+        records = None
+        for sock, (_, accepts, _) in list(self._connections.items()):
+            if sock is sender:
+                continue
+            if accepts.match_all:
+                relayed = payload
+            else:
+                if records is None:
+                    records = list(split_events(payload))
+                relayed = b''.join(record for event, record in records if accepts(event))
+            if relayed:
+                self._send(sock, encode_frame(FT_EVENTS, relayed))
+
+    def _update_interests(self):
+        # every client is told which events are received by other clients
+        for sock, connection in list(self._connections.items()):
+            interest = normalize_prefixes(
+                (prefix for other, (_, accepts, _) in self._connections.items() if other is not sock
+                 for prefix in accepts.prefixes), self.delimiter)
+            if interest != connection[2]:
+                connection[2] = interest
+                self._send(sock, encode_frame(FT_INTEREST, encode_prefixes(interest)))
+
+
+class BusClient(object):
+    """
+    Connects events to an EventsHub.
+
+    Events received from the hub are triggered in a thread of the client
+    (so ThreadSafeEvents should be used if events are changed in other threads).
+    Published events are sent in batches: when `batch_size` events are collected
+    or `flush_interval` seconds after the first of them
+    (a batch which can't be sent, e.g. when the hub is closed, is dropped).
+    By default the client subscribes to prefixes of events registered at the moment
+    (see `subscribe`).
+    """
+
+    BATCH_SIZE = 256
+    FLUSH_INTERVAL = 0.005
+
+    def __init__(self, events, path, prefixes=None, batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL):
+        self.events = events
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.interest = None  # nothing is filtered until the hub tells about other clients
+        self._batch = []
+        self._batch_ready = threading.Condition()
+        self._send_lock = threading.Lock()
+        self._closing = False
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(path)
+        self.subscribe(prefixes)
+
+        self._reader = threading.Thread(target=self._read, name='eevent-bus-reader')
+        self._writer = threading.Thread(target=self._write, name='eevent-bus-writer')
+        for thread in (self._reader, self._writer):
+            thread.daemon = True
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def subscribe(self, prefixes=None):
+        """
+        Subscribes to events by prefixes (an event is received for its prefix and its descendants).
+        Prefixes of events registered at the moment are used by default.
+        """
+        if prefixes is None:
+            prefixes = registry_prefixes(self.events)
+        else:
+            prefixes = normalize_prefixes(prefixes, self.events.DELIMITER)
+        self._send_frame(FT_SUBSCRIBE, encode_prefixes(prefixes))
+
+    def publish(self, event, *args, **kwargs):
+        """
+        Sends the trigger to other processes, returns False if nobody is subscribed to the event.
+        Raises TypeError if arguments aren't JSON serializable.
+        """
+        if self.interest is not None and not self.interest(event):
+            return False
+        record = encode_event(event, args, kwargs)
+        with self._batch_ready:
+            self._batch.append(record)
+            if len(self._batch) == 1 or len(self._batch) >= self.batch_size:
+                self._batch_ready.notify()
+        return True
+
+    def trigger(self, event, *args, **kwargs):
+        """
+        Triggers the event in this process and publishes it to other processes
+        """
+        self.publish(event, *args, **kwargs)
+        return self.events.trigger(event, *args, **kwargs)
+
+    def flush(self):
+        """
+        Sends collected events right now
+        """
+        with self._batch_ready:
+            batch, self._batch = self._batch, []
+        if batch:
+            self._send_frame(FT_EVENTS, b''.join(batch))
+
+    def close(self):
+        with self._batch_ready:
+            self._closing = True
+            self._batch_ready.notify()
+        self._writer.join()
+        self.flush()
+        _close_socket(self._socket)
+        self._reader.join()
+
+    def _send_frame(self, frame_type, payload):
+        with self._send_lock:
+            self._socket.sendall(encode_frame(frame_type, payload))
+
+    def _write(self):
+        while True:
+            with self._batch_ready:
+                while not self._batch and not self._closing:
+                    self._batch_ready.wait()
+                if self._closing:
+                    return
+                if len(self._batch) < self.batch_size:
+                    # waits for more events of the batch
+                    self._batch_ready.wait(self.flush_interval)
+            try:
+                self.flush()
+            except socket.error:
+                pass  # the batch is dropped, the writer keeps serving next ones
+
+    def _read(self):
+        reader = FrameReader()
+        while True:
+            try:
+                data = self._socket.recv(65536)
+            except socket.error as e:
+                if e.errno == errno.EINTR:
+                    continue
+                return
+            if not data:
+                return
+            for frame_type, payload in reader.feed(data):
+                if frame_type == FT_EVENTS:
+                    for _, record in split_events(payload):
+                        event, args, kwargs = decode_event(record)
+                        self.events.trigger(event, *args, **kwargs)
+                elif frame_type == FT_INTEREST:
+                    self.interest = PrefixFilter(decode_prefixes(payload), self.events.DELIMITER)
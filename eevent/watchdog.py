@@ -0,0 +1,96 @@
+# coding=utf-8
+"""
+Single thread which calls callbacks at their deadlines
+(see Events.trigger_threaded, DeferredEvents and throttling.Debounce)
+"""
+
+import threading
+import traceback
+from heapq import heappush, heappop
+from itertools import count
+from timeit import default_timer
+
+
+class Watchdog(object):
+    """
+    Calls scheduled callbacks in its thread (started by the first `call_later`).
+    Callbacks should be short, since they delay each other.
+    """
+
+    def __init__(self, name='eevent-watchdog'):
+        self.name = name
+        self._heap = []  # [deadline, number, callback, args]
+        self._numbers = count()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+
+    def __repr__(self):
+        return '{}({!r})'.format(self.__class__.__name__, self.name)
+
+    def call_later(self, delay, callback, *args):
+        """
+        Schedules the callback in `delay` seconds, returns an entry to cancel
+        """
+        entry = [default_timer() + delay, next(self._numbers), callback, args]
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError('{!r} is stopped'.format(self))
+            heappush(self._heap, entry)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self.name)
+                self._thread.daemon = True
+                self._thread.start()
+            elif self._heap[0] is entry:
+                self._condition.notify()
+        return entry
+
+    def cancel(self, entry):
+        entry[2] = None  # dropped at its deadline
+
+    def stop(self):
+        """
+        Stops the thread, not called callbacks are dropped
+        """
+        with self._condition:
+            self._stopped = True
+            del self._heap[:]
+            self._condition.notify()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    delay = self._heap[0][0] - default_timer()
+                    if delay <= 0:
+                        break
+                    self._condition.wait(delay)
+                if self._stopped:
+                    return
+                _, _, callback, args = heappop(self._heap)
+            if callback is not None:
+                try:
+                    callback(*args)
+                except Exception:
+                    traceback.print_exc()
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared_watchdog():
+    """
+    Watchdog shared by deferred triggers and throttling policies (created on the first call)
+    """
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = Watchdog('eevent-shared-watchdog')
+        return _shared
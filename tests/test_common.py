@@ -1,5 +1,23 @@
+import os
+import re
+import gc
+import copy
+import time
+import pickle
+import random
+import threading
 import unittest
-from eevent import events
+from eevent import events, throttling
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+try:
+    from concurrent import futures
+except ImportError:
+    futures = None
 
 
 ARGS = (123, 'abc',)
@@ -14,10 +32,14 @@ def func_factory(some_text):
     return func
 
 
+def process_id(*args, **kwargs):
+    return os.getpid()
+
+
 class BaseTestCase(unittest.TestCase):
     def __getattr__(self, item):
         new_name = item[0] + item.title().replace('_', '')[1:]
-        if hasattr(self, new_name):
+        if not item.startswith('_') and new_name != item and hasattr(self, new_name):
             return getattr(self, new_name)
         raise AttributeError
 
@@ -94,6 +116,42 @@ class BasicTest(BaseTestCase):
         self.e.off()
         self.assert_false(self.e, 'Some events are still registered. All events must be cleared.')
 
+    def test_bind_handler_once(self):
+        self.e.on('F', [self.func_2, self.func_1])
+        self.assert_equal(list(self.e['F']), [self.func_1, self.func_2, self.func_3])
+
+    def test_bind_many(self):
+        func_y = func_factory('Y')
+        self.e.on_many([('G', self.func_1), (['H', 'F'], [func_y, self.func_2])])
+        self.assert_equal(self.e.trigger('G'), ['F1'])
+        self.assert_equal(self.e.trigger('H'), ['Y', 'F2'])
+        self.assert_equal(self.e.trigger('F'), ['F1', 'F2', 'F3', 'Y'])
+
+        self.e.off_many({'F': [func_y, self.func_1], 'G': None, ('H', 'D'): func_y})
+        self.assert_false('G' in self.e)
+        self.assert_equal(self.e.trigger('F'), ['F2', 'F3'])
+        self.assert_equal(self.e.trigger('H'), ['F2'])
+        self.assert_equal(self.e.trigger('D'), ['X', 'X+'])
+
+    def test_pickle_and_copy(self):
+        for cls in (events.Events, events.ThreadSafeEvents, events.CompactEvents, events.FrozenEvents):
+            e = cls({'r': [process_id], 'r:a:~': [len], 'r:a*': [str]})
+            e.trigger('r:a:b', 'x')  # fills caches and pools lock is taken by pools
+            for other in (pickle.loads(pickle.dumps(e, pickle.HIGHEST_PROTOCOL)), copy.copy(e)):
+                self.assert_equal(type(other), cls)
+                self.assert_equal(other, e)
+                self.assert_equal(other.trigger('r:a:b', 'x'), e.trigger('r:a:b', 'x'))
+            if cls is events.FrozenEvents:
+                continue
+            results = e.trigger('r:a:b', 'x')
+            other = copy.copy(e)
+            other.on('r:a:~', process_id)
+            other.off('r:a*', str)
+            other.on('x:*', len)
+            self.assert_equal(e.trigger('r:a:b', 'x'), results)
+            self.assert_equal(sorted(other.trigger('r:a:b', 'x')), [1, os.getpid()])
+            self.assert_equal(e.trigger('x:y', 'ab'), [])
+
 
 class HierarchyTest(BaseTestCase):
     def setUp(self):
@@ -163,6 +221,52 @@ class WildCardTest(BaseTestCase):
                                              'app:ui:footer:counter',
                                              'app:ui:header:counter'])
 
+    def test_reverse_matching(self):
+        e = events.Events()
+        for event in ('app:*', 'app:ui:*', 'app:ui:~:counter', '~:ui:*', 'app:log*', 'app:ui'):
+            e[event] = [func_factory(event)]
+        opt_current = e.options(propagate=e.ES_PROPAGATE_CURRENT)
+
+        results = e.trigger('app:ui:sidebar:counter', **opt_current)
+        self.assert_list_set_equal(results, ['app:*', 'app:ui:*', 'app:ui:~:counter', '~:ui:*'])
+
+        results = e.trigger('app:logger', **opt_current)
+        self.assert_list_set_equal(results, ['app:*', 'app:log*'])
+
+        del e['app:ui:*']
+        del e['app:log*']
+        results = e.trigger('app:ui:sidebar:counter', **opt_current)
+        self.assert_list_set_equal(results, ['app:*', 'app:ui:~:counter', '~:ui:*'])
+
+        results = e.trigger('other', **opt_current)
+        self.assert_list_set_equal(results, [])
+
+    def regex_match(self, pattern, name):
+        # wild cards semantics as regular expressions
+        safe = '.+'.join(re.escape(pattern).split(re.escape(self.e.WILD_CARD)))
+        safe = '[^{}]+'.format(self.e.DELIMITER).join(safe.split(re.escape(self.e.SOFT_WILD_CARD)))
+        return re.match(r'^{}$'.format(safe), name) is not None
+
+    def test_patterns_match_as_regex(self):
+        rnd = random.Random(42)
+        segments = ['a', 'b', 'ab', '', '*', '~', 'a*', '~b', '*~']
+        names = set(':'.join(rnd.choice(segments[:4]) for _ in range(rnd.randint(1, 5))) for _ in range(300))
+        patterns = set(':'.join(rnd.choice(segments) for _ in range(rnd.randint(1, 4))) for _ in range(300))
+        patterns.update(['*', '~', '**', '*:*', 'a:*:b', '*a', 'a*', 'a~b'])
+        e = events.Events()
+        for name in names:
+            e[name] = [func_factory(name)]
+        for pattern in sorted(patterns):
+            expected = set(name for name in names if name != pattern and self.regex_match(pattern, name))
+            self.assert_equal(set(e._prepare_events(pattern)[:-1]) - set([pattern]), expected, pattern)
+
+        e = events.Events()
+        for pattern in patterns:
+            e[pattern] = [func_factory(pattern)]
+        for name in sorted(names):
+            expected = set(pattern for pattern in patterns if pattern != name and self.regex_match(pattern, name))
+            self.assert_equal(set(e._prepare_events(name)[:-1]) - set([name]), expected, name)
+
 
 class PropagationTest(BaseTestCase):
     def setUp(self):
@@ -297,10 +401,104 @@ class PropagationTest(BaseTestCase):
         results = self.e.trigger('r', **self.opt_d)
         self.assert_list_set_equal(results, ['r:a', 'r:b', 'r:a:aa', 'r:a:aa:aaa', 'r:a:ab:aaa', 'r:b:bb:bbb'])
 
+    def test_deep_propagation_follows_registry(self):
+        self.e.off('r:a:aa:aaa')
+        self.e.on('r:a:ac', func_factory('r:a:ac'))
+        self.e['r:a:ab:abb'] = [func_factory('r:a:ab:abb')]
+        del self.e['r:a:ab:aaa']
+
+        results = self.e.trigger('r:a', **self.opt_d)
+        self.assert_list_set_equal(results, ['r:a:aa', 'r:a:ab:abb', 'r:a:ac'])
+
+        self.e.off()
+        results = self.e.trigger('r', **self.opt_tcd)
+        self.assert_list_set_equal(results, [])
+
 
 class CallOrderTest(BaseTestCase):
     def setUp(self):
         self.e = events.Events()
+        self.e.on('r:a:aa', func_factory('r:a:aa'))
+        self.e.on('r:a-b', func_factory('r:a-b'))
+        self.e.on('r:a', func_factory('r:a'))
+        self.e.on('r:b', func_factory('r:b'))
+        self.e.on('r', func_factory('r'))
+        self.opt_propagate = self.e.options(propagate=self.e.ES_PROPAGATE_TO_TOP |
+                                            self.e.ES_PROPAGATE_CURRENT |
+                                            self.e.ES_PROPAGATE_TO_DEEP)
+
+    def test_from_current(self):
+        results = self.e.trigger('r:a', **self.opt_propagate)
+        self.assert_equal(results, ['r:a', 'r', 'r:a:aa'])
+
+        results = self.e.trigger('r', **self.opt_propagate)
+        self.assert_equal(results, ['r', 'r:a', 'r:a-b', 'r:a:aa', 'r:b'])
+
+    def test_from_the_begin(self):
+        results = self.e.trigger('r:a', **dict(self.opt_propagate, **self.e.options(
+            call_order=self.e.CO_FROM_THE_BEGIN)))
+        self.assert_equal(results, ['r', 'r:a', 'r:a:aa'])
+
+    def test_from_the_end(self):
+        results = self.e.trigger('r:a', **dict(self.opt_propagate, **self.e.options(
+            call_order=self.e.CO_FROM_THE_END)))
+        self.assert_equal(results, ['r:a:aa', 'r:a', 'r'])
+
+    def test_priorities(self):
+        self.e.on('r', func_factory('r!'), priority=10)
+        self.e.on('r:a', func_factory('r:a!'), priority=10)
+        self.e.on('r:a', func_factory('r:a?'), priority=-1)
+        self.e.on('r:a', func_factory('r:a+'))
+        self.assert_equal(self.e.trigger('r:a'), ['r:a!', 'r!', 'r:a', 'r:a+', 'r', 'r:a?'])
+
+        results = self.e.trigger('r:a', **self.e.options(call_order=self.e.CO_FROM_THE_BEGIN))
+        self.assert_equal(results, ['r!', 'r:a!', 'r', 'r:a', 'r:a+', 'r:a?'])
+
+    def test_priorities_are_kept_sorted(self):
+        for handlers_class in (events.Handlers, events.CompactHandlers):
+            hs = handlers_class()
+            for name, priority in [('a', 0), ('b', 5), ('c', 0), ('d', 5), ('e', 10)]:
+                hs.add(name, events.HandlerOptions(priority=priority))
+            self.assert_equal(list(hs), ['e', 'b', 'd', 'a', 'c'])
+
+            hs.add('a', events.HandlerOptions(priority=7))
+            hs.add('e', events.HandlerOptions(cpu_bound=True, priority=10))
+            self.assert_equal(list(hs), ['e', 'a', 'b', 'd', 'c'])
+            self.assert_equal([o.priority for o in hs.values()], [10, 7, 5, 5, 0])
+
+    def test_handlers_layout(self):
+        handler = func_factory('r')
+        self.assert_less(events.deep_sizeof(events.Handlers([handler])), 3 * events.deep_sizeof([handler]))
+
+        funcs = [func_factory(i) for i in range(events.Handlers.SMALL_SIZE * 2)]
+        hs = events.Handlers(funcs[:3])
+        hs.add(funcs[3], events.HandlerOptions(cpu_bound=True))
+        hs.extend(funcs[4:])
+        self.assert_equal(list(hs), funcs)
+        self.assert_equal([o.cpu_bound for o in hs.values()], [i == 3 for i in range(len(funcs))])
+        for func in funcs[::2]:
+            hs.remove(func)
+        self.assert_equal(list(hs), funcs[1::2])
+        self.assert_true(hs[funcs[3]].cpu_bound)
+        self.assert_raises(KeyError, hs.remove, funcs[0])
+
+    def test_binding_scales_linearly(self):
+        options = [events.HandlerOptions(priority=priority) for priority in (0, 5, 10)]
+
+        def bind(count):
+            hs = events.Handlers()
+            started = time.time()
+            for i in range(count):
+                hs.add(func_factory(i), options[i % 3])  # every other bind is a non-tail insert
+            return time.time() - started, hs
+
+        bind(1000)  # warm up
+        small, _ = bind(2000)
+        large, hs = bind(16000)
+        self.assert_equal(len(hs), 16000)
+        self.assert_equal([o.priority for o in hs.values()], sorted((o.priority for o in hs.values()), reverse=True))
+        # quadratic binding would take ~64 times longer
+        self.assert_less(large, max(small, 0.001) * 24)
 
 
 class InvokeHandlersTest(BaseTestCase):
@@ -336,6 +534,960 @@ class InvokeHandlersTest(BaseTestCase):
         self.assert_equals(results.count('r'), 2)
 
 
+class LazyTriggerTest(BaseTestCase):
+    def setUp(self):
+        self.e = events.Events()
+        self.calls = []
+
+        def handler_factory(result):
+            def handler(*args, **kwargs):
+                self.calls.append(result)
+                return result
+            return handler
+
+        self.e.on('r', handler_factory('r'))
+        self.e.on('r:a', [handler_factory(None), handler_factory(0), handler_factory('r:a')])
+
+    def test_trigger_iter(self):
+        results = self.e.trigger_iter('r:a', *ARGS, **KWARGS)
+        self.assert_equal(self.calls, [])
+        self.assert_equal(next(results), None)
+        self.assert_equal(next(results), 0)
+        self.assert_equal(self.calls, [None, 0])
+        self.assert_equal(list(results), ['r:a', 'r'])
+
+    def test_first_any(self):
+        self.assert_equal(self.e.trigger_first('r:a'), 0)
+        self.assert_equal(self.calls, [None, 0])
+        self.assert_true(self.e.trigger_any('r:a'))
+        self.assert_equal(self.calls[2:], [None, 0, 'r:a'])
+        self.assert_equal(self.e.trigger_first('nothing'), None)
+        self.assert_false(self.e.trigger_any('nothing'))
+
+    def test_notify(self):
+        self.assert_is_none(self.e.notify('r:a', **self.e.options(propagate=self.e.ES_PROPAGATE_CURRENT)))
+        self.assert_equal(self.calls, [None, 0, 'r:a'])
+
+    def test_instrumentation(self):
+        stats = self.e.instrument()
+        self.e.notify('r:a')
+        self.assert_equal(list(self.e.trigger_iter('r')), ['r'])
+        self.assert_equal(stats.events['r:a'].count, 1)
+        self.assert_equal(sum(timing.count for timing in stats.handlers.values()), 5)
+
+
+class TriggerManyTest(BaseTestCase):
+    def setUp(self):
+        self.e = events.Events()
+        self.e.on('r:a', func_factory('r:a'))
+        self.e.on('r:b', func_factory('r:b'))
+        self.e.on('r', func_factory('r'))
+
+    def test_trigger_many(self):
+        results = self.e.trigger_many([('r:a', ARGS, KWARGS), ('r:b', (), {}), (['r:a', 'r:b'], ARGS, {})])
+        self.assert_equal(list(results), [['r:a', 'r'], ['r:b', 'r'], ['r:a', 'r', 'r:b']])
+
+        results = self.e.trigger_many([('r:a', (), {})], **self.e.options(propagate=self.e.ES_PROPAGATE_CURRENT))
+        self.assert_equal(list(results), [['r:a']])
+
+    def test_lazy_batch(self):
+        calls = []
+        self.e.on('counter', lambda i: calls.append(i) or i)
+        results = self.e.trigger_many(('counter', (i,), {}) for i in range(1000))
+        self.assert_equal(next(results), [0])
+        self.assert_equal(next(results), [1])
+        self.assert_equal(calls, [0, 1])
+
+    def test_registry_changes(self):
+        def bind(*args, **kwargs):
+            self.e.on('r:b', func_factory('r:b+'))
+            return 'bind'
+        self.e.on('bind', bind)
+        results = self.e.trigger_many([('r:b', (), {}), ('bind', (), {}), ('r:b', (), {})])
+        self.assert_equal(list(results), [['r:b', 'r'], ['bind'], ['r:b', 'r:b+', 'r']])
+
+
+class ThreadSafeEventsTest(BaseTestCase):
+    def setUp(self):
+        self.e = events.ThreadSafeEvents()
+        self.e.on('r:a', func_factory('r:a'))
+        self.e.on('r', func_factory('r'))
+
+    def test_copy_on_write(self):
+        handlers = self.e['r:a']
+        func = func_factory('r:a+')
+        self.e.on('r:a', func)
+        self.assert_equal(list(handlers), list(self.e['r:a'])[:1])
+        self.assert_equal(self.e.trigger('r:a'), ['r:a', 'r:a+', 'r'])
+
+        handlers = self.e['r:a']
+        self.e.off('r:a', func)
+        self.assert_equal(len(handlers), 2)
+        self.assert_equal(self.e.trigger('r:a'), ['r:a', 'r'])
+
+    def test_concurrent_changes(self):
+        errors = []
+        stop = threading.Event()
+
+        def fire():
+            try:
+                while not stop.is_set():
+                    results = self.e.trigger('r:a:aa', **self.e.options(propagate=self.e.ES_PROPAGATE_TO_TOP))
+                    self.assert_equal(results[:2], ['r', 'r:a'])
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=fire) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for i in range(200):
+            func = func_factory('r:a:%s' % i)
+            self.e.on(['r:a', 'r:a:%s' % i], func)
+            self.e.off('r:a', func)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        self.assert_equal(errors, [])
+        self.assert_equal(len(self.e), 202)
+
+
+class ReCacheTest(BaseTestCase):
+    def setUp(self):
+        class SmallCacheEvents(events.Events):
+            RE_CACHE_SIZE = 2
+
+        self.e = SmallCacheEvents()
+        self.e.on('app:log', func_factory('app:log'))
+
+    def test_bounded_cache(self):
+        for pattern in ('app:~', 'app:*', '*:log', '~:log'):
+            self.e.trigger(pattern)
+        info = self.e.re_cache_info()
+        self.assert_equal(info.currsize, 2)
+        self.assert_equal(info.evictions, 2)
+        self.assert_equal(info.misses, 4)
+
+        self.assert_equal(self.e.trigger('app:l*', **self.e.options(propagate=self.e.ES_PROPAGATE_CURRENT)),
+                          ['app:log'])
+
+    def test_warm_up(self):
+        self.e.warm_re_cache(['app:~', 'app:log', ' *:log '])
+        self.assert_equal(self.e.re_cache_info().currsize, 2)
+        self.e.trigger(['*:log', 'app:~'])
+        info = self.e.re_cache_info()
+        self.assert_equal((info.hits, info.misses), (2, 2))
+
+    def test_registered_patterns(self):
+        for i in range(300):
+            self.e.on('app:log{}*'.format(i), func_factory(i))
+        info = self.e.re_cache_info()
+        for i in range(50):
+            self.assertIn(i, self.e.trigger('app:log{}0'.format(i)))
+        self.assert_equal(self.e.re_cache_info(), info)  # registered patterns are compiled once
+
+
+class InstrumentationTest(BaseTestCase):
+    def setUp(self):
+        self.e = events.Events()
+        self.fast = func_factory('fast')
+        self.e.on('r', self.fast)
+
+        def slow(*args, **kwargs):
+            time.sleep(0.02)
+            return 'slow'
+        self.slow = slow
+        self.e.on('r:a', self.slow)
+
+    def test_timings(self):
+        slow_calls = []
+        hooks = []
+        stats = self.e.instrument(slow_threshold=0.01,
+                                  on_slow_handler=lambda *args: slow_calls.append(args),
+                                  pre_trigger=lambda events, args, kwargs: hooks.append(('pre', events)),
+                                  post_trigger=lambda events, results, duration: hooks.append(('post', results)))
+        self.assert_equal(self.e.trigger('r:a', *ARGS), ['slow', 'fast'])
+        self.assert_equal(self.e.trigger('r'), ['fast'])
+        self.assert_equal(list(self.e.trigger_many([(['r'], (), {})])), [['fast']])
+
+        self.assert_equal(hooks, [('pre', 'r:a'), ('post', ['slow', 'fast']), ('pre', 'r'), ('post', ['fast']),
+                                  ('pre', ('r',)), ('post', ['fast'])])
+        self.assert_equal([(events, handler) for events, handler, duration in slow_calls], [('r:a', self.slow)])
+
+        self.assert_equal(stats.events['r:a'].count, 1)
+        self.assert_greater_equal(stats.events['r:a'].max, 0.02)
+        self.assert_equal(stats.handlers[self.fast].count, 3)
+        self.assert_equal(sum(stats.handlers[self.slow].histogram), 1)
+        self.assert_equal(stats.report()['events']['r']['count'], 1)
+
+        self.assert_is(self.e.uninstrument(), stats)
+        self.e.trigger('r')
+        self.assert_equal(stats.events['r'].count, 1)
+
+    def test_handler_errors(self):
+        def fail(*args, **kwargs):
+            raise ValueError('fail')
+        self.e.on('r', fail)
+        stats = self.e.instrument()
+        self.assert_raises(ValueError, self.e.trigger, 'r')
+        self.assert_equal(stats.handlers[fail].count, 1)
+        self.assert_equal(stats.events['r'].count, 1)
+
+
+class WeakHandlersTest(BaseTestCase):
+    class Controller(object):
+        def __init__(self, name):
+            self.name = name
+
+        def handle(self, *args, **kwargs):
+            return self.name
+
+    def setUp(self):
+        self.e = events.Events()
+        self.e.on('r', func_factory('r'))
+
+    def test_bound_methods(self):
+        first, second = self.Controller('first'), self.Controller('second')
+        self.e.on(['r:a', 'r:b'], [first.handle, second.handle], weak=True)
+        self.assert_equal(self.e.trigger('r:a'), ['first', 'second', 'r'])
+
+        del first
+        gc.collect()
+        self.assert_equal(self.e.trigger('r:a'), ['second', 'r'])
+        self.assert_equal(len(self.e['r:b']), 1)
+
+        del second
+        gc.collect()
+        self.assert_equal(self.e.trigger('r:a'), ['r'])
+        self.assert_false('r:a' in self.e or 'r:b' in self.e)
+
+    def test_functions(self):
+        func = func_factory('weak')
+        self.e.on('r', func, weak=True)
+        self.assert_equal(self.e.trigger('r'), ['r', 'weak'])
+        del func
+        gc.collect()
+        self.assert_equal(self.e.trigger('r'), ['r'])
+
+    def test_unbind(self):
+        controller = self.Controller('controller')
+        self.e.on(['r:a', 'r:b'], controller.handle, weak=True)
+        self.e.on('r:b', controller.handle)
+        self.assert_equal(self.e.trigger(['r:a', 'r:b']), ['controller', 'r'])
+
+        self.e.off('r:a', controller.handle)
+        self.assert_false('r:a' in self.e)
+        self.assert_raises(ValueError, self.e.on, 'r:a', process_id, cpu_bound=True, weak=True)
+
+
+class CompactEventsTest(BaseTestCase):
+    def setUp(self):
+        self.e = events.CompactEvents()
+        self.func = func_factory('r:a')
+        self.e.on('r:a', self.func)
+        self.e.on('r:a', func_factory('r:a+'))
+        self.e.on('r', func_factory('r'))
+        self.e['r:*'] = [func_factory('r:*')]
+
+    def test_trigger(self):
+        self.assert_is_instance(self.e['r:a'], events.CompactHandlers)
+        self.assert_equal(self.e.trigger('r:a'), ['r:*', 'r', 'r:a', 'r:a+'])
+        self.assert_equal(self.e.trigger('r', **self.e.options(propagate=self.e.ES_PROPAGATE_TO_DEEP)),
+                          ['r:*', 'r:a', 'r:a+'])
+
+        self.e.off('r:a', self.func)
+        self.assert_equal(self.e.trigger('r:a'), ['r:*', 'r', 'r:a+'])
+        self.e.on('r:a', self.func)
+        self.assert_equal(len(self.e['r:a']), 2)
+        self.assert_is(list(self.e['r:a'])[-1], self.func)
+
+    def test_handler_options(self):
+        self.e.on('r:a', process_id, cpu_bound=True)
+        options = list(self.e['r:a'].values())
+        self.assert_equal([o.cpu_bound for o in options], [False, False, True])
+        self.e.off('r:a', process_id)
+        self.assert_is_none(self.e['r:a']._options)
+
+    def test_memory_report(self):
+        e = events.Events()
+        for i in range(100):
+            name = 'app:m{}:e{}'.format(i % 10, i)
+            e.on(name, self.func)
+            self.e.on(name, self.func)
+        report, compact_report = e.memory_report(), self.e.memory_report()
+        self.assert_equal(sum(v for k, v in report.items() if k != 'total'), report['total'])
+        self.assert_less(compact_report['handlers'], report['handlers'])
+        self.assert_less(compact_report['total'], report['total'])
+
+    def test_memory_against_plain_lists(self):
+        e = events.CompactEvents()
+        plain = {}
+        for i in range(1000):
+            name = 'app:m{}:e{}'.format(i % 10, i)
+            e.on(name, self.func)
+            plain[name] = [self.func]
+        report = e.memory_report()
+        self.assert_less(report['handlers'], sum(events.deep_sizeof(hs) for hs in plain.values()))
+        # the events tree (for propagation lookups) costs more than the handlers save
+        self.assert_greater(report['total'], events.deep_sizeof(plain))
+        self.assert_less(report['total'], 2.5 * events.deep_sizeof(plain))
+
+
+class PlansCacheTest(BaseTestCase):
+    def setUp(self):
+        self.e = events.Events()
+        self.e.on('r:a', func_factory('r:a'))
+        self.e.on('r', func_factory('r'))
+
+    def test_cache_hits(self):
+        self.assert_equal(self.e.trigger('r:a'), ['r:a', 'r'])
+        self.assert_equal(self.e.trigger('r:a'), ['r:a', 'r'])
+        self.assert_equal(self.e.trigger(['r:a']), ['r:a', 'r'])
+        info = self.e.plans_info()
+        self.assert_equal((info.hits, info.misses, info.currsize), (1, 2, 2))
+
+    def test_invalidation(self):
+        self.e.trigger('r:a')
+        self.e.on('r:a', func_factory('r:a+'))
+        self.assert_equal(self.e.trigger('r:a'), ['r:a', 'r:a+', 'r'])
+
+        self.e['r:a'] = [func_factory('r:a*')]
+        self.assert_equal(self.e.trigger('r:a'), ['r:a*', 'r'])
+
+        del self.e['r']
+        self.assert_equal(self.e.trigger('r:a'), ['r:a*'])
+
+        self.e.off()
+        self.assert_equal(self.e.trigger('r:a'), [])
+        self.assert_equal(self.e.plans_info().hits, 0)
+
+    def test_handlers_changes(self):
+        for e in (events.Events(), events.ThreadSafeEvents(), events.CompactEvents()):
+            e.on('r', func_factory('r'))
+            self.assert_equal(e.trigger('r'), ['r'])
+            e['r'].append(func_factory('r+'))
+            self.assert_equal(e.trigger('r'), ['r', 'r+'])
+            e['r'].add(func_factory('r*'), events.HandlerOptions(priority=1))
+            self.assert_equal(e.trigger('r'), ['r*', 'r', 'r+'])
+            e['r'].remove(list(e['r'])[0])
+            self.assert_equal(e.trigger('r'), ['r', 'r+'])
+
+        # handlers of another registry are copied
+        other = events.Events()
+        other['r'] = self.e['r']
+        self.assert_is_not(other['r'], self.e['r'])
+        self.e.trigger('r')
+        other['r'].append(func_factory('r+'))
+        self.assert_equal(self.e.trigger('r'), ['r'])
+        self.assert_equal(other.trigger('r'), ['r', 'r+'])
+
+    def test_iterators_of_events(self):
+        self.assert_equal(self.e.trigger(event for event in ['r:a', 'r']), ['r:a', 'r'])
+        self.assert_equal(self.e.trigger(['r:a', 'r']), ['r:a', 'r'])
+        self.assert_equal(list(self.e.trigger_iter(iter(['r']))), ['r'])
+        self.assert_equal(list(self.e.trigger_many([(iter(['r:a']), (), {}), (('r:a',), (), {})])),
+                          [['r:a', 'r'], ['r:a', 'r']])
+
+    def test_max_size(self):
+        self.e.PLANS_CACHE_SIZE = 2
+        for event in ('r', 'r:a', 'r:b', 'r:c'):
+            self.e.trigger(event)
+        self.assert_equal(self.e.plans_info().currsize, 2)
+
+
+def stop_factory(*result):
+    def stop(*args, **kwargs):
+        raise events.StopPropagation(*result)
+    return stop
+
+
+class StopPropagationTest(BaseTestCase):
+    def setUp(self):
+        self.e = events.Events()
+        self.e.on('r', func_factory('r'))
+        self.e.on('r:a', [func_factory('r:a'), stop_factory('stop'), func_factory('r:a+')])
+        self.e.on('r:a:aa', func_factory('r:a:aa'))
+        self.e.on('r:b', [stop_factory(), func_factory('r:b')])
+
+    def test_trigger(self):
+        self.assert_equal(self.e.trigger('r:a:aa', *ARGS, **KWARGS), ['r:a:aa', 'r', 'r:a', 'stop'])
+        self.assert_equal(self.e.trigger('r:b'), [])
+        self.assert_equal(self.e.trigger('r:b', **self.e.options(propagate=self.e.ES_PROPAGATE_TO_TOP)), ['r'])
+
+    def test_trigger_iter(self):
+        self.assert_equal(list(self.e.trigger_iter('r:a:aa')), ['r:a:aa', 'r', 'r:a', 'stop'])
+        self.assert_equal(list(self.e.trigger_iter('r:b')), [])
+
+    def test_notify_and_trigger_many(self):
+        self.assert_is_none(self.e.notify('r:a'))
+        triggers = [('r:a', (), {}), ('r:b', (), {}), ('r:a:aa', ARGS, KWARGS)]
+        self.assert_equal(list(self.e.trigger_many(triggers)), [['r:a', 'stop'], [], ['r:a:aa', 'r', 'r:a', 'stop']])
+
+    def test_instrumented(self):
+        self.e.instrument()
+        self.assert_equal(self.e.trigger('r:a'), ['r:a', 'stop'])
+        self.assert_equal(list(self.e.trigger_iter('r:a')), ['r:a', 'stop'])
+        self.assert_equal(self.e.uninstrument().events['r:a'].count, 1)
+
+
+class EmitterTest(BaseTestCase):
+    def setUp(self):
+        self.e = events.Events()
+        self.e.on('r', func_factory('r'))
+        self.e.on('r:a', func_factory('r:a'))
+
+    def test_emit(self):
+        emit = self.e.emitter('r:a')
+        self.assert_equal(emit(*ARGS, **KWARGS), ['r:a', 'r'])
+        self.assert_equal(self.e.emitter(['r:a', 'r'], unique_call=self.e.TB_CALL_EVERY)(), ['r:a', 'r', 'r'])
+        emit = self.e.emitter('r:a', propagate=self.e.ES_PROPAGATE_CURRENT)
+        self.assert_equal(emit(), ['r:a'])
+
+    def test_revalidation(self):
+        emit = self.e.emitter('r:a')
+        emit()
+        emit()
+        self.assert_equal(self.e.plans_info().misses, 1)
+        self.assert_equal(self.e.plans_info().hits, 0)
+
+        self.e.on('r:a', func_factory('r:a+'))
+        self.assert_equal(emit(), ['r:a', 'r:a+', 'r'])
+        self.e.off('r')
+        self.assert_equal(emit(), ['r:a', 'r:a+'])
+
+    def test_instrumented(self):
+        emit = self.e.emitter('r:a')
+        self.e.instrument()
+        emit()
+        self.assert_equal(self.e.uninstrument().events['r:a'].count, 1)
+
+
+class FrozenEventsTest(BaseTestCase):
+    def setUp(self):
+        self.e = events.Events()
+        self.e.on('r', func_factory('r'))
+        self.e.on('r:a', func_factory('r:a'))
+        self.e.on('r:a:aa', func_factory('r:a:aa'))
+        self.e['x:*'] = [func_factory('x:*')]
+        self.frozen = self.e.freeze(call_orders=(self.e.CO_DEFAULT, self.e.CO_FROM_THE_END))
+
+    def test_trigger(self):
+        for trigger_events in ['r:a:aa', 'r', ['r:a', 'r'], 'x:y', 'x:*', 'unknown']:
+            self.assert_equal(self.frozen.trigger(trigger_events, *ARGS, **KWARGS),
+                              self.e.trigger(trigger_events, *ARGS, **KWARGS))
+        options = self.e.options(call_order=self.e.CO_FROM_THE_BEGIN, propagate=self.e.ES_PROPAGATE_CURRENT)
+        self.assert_equal(self.frozen.trigger('r:a:aa', **options), ['r:a:aa'])
+        self.assert_equal(list(self.frozen.trigger_iter('r:a')), ['r:a', 'r'])
+
+    def test_precompiled_plans(self):
+        self.frozen.trigger('r:a:aa')
+        self.frozen.trigger('r:a', **self.e.options(call_order=self.e.CO_FROM_THE_END))
+        self.assert_equal(self.frozen.plans_info().misses, 0)
+
+        # not registered events are resolved once
+        self.frozen.trigger('x:y')
+        self.frozen.trigger('x:y')
+        info = self.frozen.plans_info()
+        self.assert_equal((info.hits, info.misses), (1, 1))
+
+    def test_immutable(self):
+        self.assert_raises(TypeError, self.frozen.on, 'r', func_factory('r+'))
+        self.assert_raises(TypeError, self.frozen.off, 'r')
+        self.assert_raises(TypeError, self.frozen.__setitem__, 'r', [])
+        self.assert_raises(TypeError, self.frozen.clear)
+        self.assert_raises(TypeError, self.frozen['r'].append, func_factory('r+'))
+        self.assert_raises(TypeError, self.frozen['r'].remove, list(self.frozen['r'])[0])
+        self.assert_equal(self.frozen.trigger('r', **self.e.options(call_order=self.e.CO_FROM_THE_END)), ['r'])
+        self.assert_equal(self.frozen.trigger('r'), ['r'])
+        self.e.on('r:a', func_factory('r:a+'))
+        self.assert_equal(self.frozen.trigger('r:a'), ['r:a', 'r'])
+
+    def test_subclass_configuration(self):
+        class DottedEvents(events.Events):
+            DELIMITER = '.'
+
+            def budget_exceeded(self, events, handler, budget):
+                exceeded.append(budget)
+
+        exceeded = []
+        e = DottedEvents()
+        e.on('r', func_factory('r'), optional=True)
+        e.on('r.a', [time.sleep, func_factory('r.a')])
+        frozen = e.freeze()
+        self.assert_is_instance(frozen, events.FrozenEvents)
+        self.assert_is_instance(frozen, DottedEvents)
+        self.assert_is(frozen.__class__, e.freeze().__class__)
+        self.assert_equal(frozen.trigger('r.a', 0), [None, 'r.a', 'r'])
+        self.assert_equal(frozen.trigger('r.a', 0.1, **e.options(budget=0.05)), [None, 'r.a'])
+        self.assert_equal(exceeded, [0.05])
+
+        for e in (events.ThreadSafeEvents(), events.CompactEvents()):
+            e.on('r:a', func_factory('r:a'))
+            frozen = e.freeze()
+            self.assert_is_instance(frozen, e.__class__)
+            self.assert_is_instance(frozen['r:a'], events.FrozenHandlers)
+            self.assert_equal(frozen.trigger('r:a'), ['r:a'])
+            self.assert_raises(TypeError, frozen.on, 'r', func_factory('r'))
+
+    def test_weak_handlers(self):
+        self.e.on('w', func_factory('w'), weak=True)
+        self.assert_raises(ValueError, self.e.freeze)
+
+
+class BudgetTest(BaseTestCase):
+    def setUp(self):
+        self.e = events.Events()
+        self.exceeded = []
+        self.e.budget_exceeded = lambda events, handler, budget: self.exceeded.append((events, handler, budget))
+
+    def slow_factory(self, some_text, delay=0.05):
+        def func(*args, **kwargs):
+            time.sleep(delay)
+            return some_text
+        return func
+
+    def test_optional_handlers_are_skipped(self):
+        optional = func_factory('r:optional')
+        self.e.on('r', self.slow_factory('r:slow'))
+        self.e.on('r', optional, optional=True)
+        self.e.on('r', func_factory('r:required'))
+        self.assert_equal(self.e.trigger('r', **self.e.options(budget=0.01)), ['r:slow', 'r:required'])
+        self.assert_equal(self.exceeded, [('r', optional, 0.01)])
+        self.assert_equal(self.e.trigger('r', **self.e.options(budget=1)), ['r:slow', 'r:optional', 'r:required'])
+        self.assert_equal(self.e.trigger('r'), ['r:slow', 'r:optional', 'r:required'])
+
+    def test_instrumentation(self):
+        triggers = []
+        instrumentation = self.e.instrument(pre_trigger=lambda events, args, kwargs: triggers.append(events),
+                                            post_trigger=lambda events, results, duration: triggers.append(results))
+        self.e.on('r', self.slow_factory('r:slow', 0.02))
+        self.e.on('r', func_factory('r:optional'), optional=True)
+        self.assert_equal(self.e.trigger('r', **self.e.options(budget=0.01)), ['r:slow'])
+        self.assert_equal(triggers, ['r', ['r:slow']])
+        report = instrumentation.report()
+        self.assert_equal(report['events']['r']['count'], 1)
+        self.assert_equal(len(report['handlers']), 1)
+
+
+class ThrottlingTest(BaseTestCase):
+    def setUp(self):
+        self.e = events.Events()
+        self.calls = []
+        self.e.on('r', lambda *args, **kwargs: self.calls.append(('r',) + args))
+        self.e.on('r:a', lambda *args, **kwargs: self.calls.append(('r:a',) + args))
+        self.e.on('x:y', lambda *args, **kwargs: self.calls.append(('x:y',) + args))
+
+    def test_min_interval(self):
+        self.e.throttle('r', throttling.MinInterval(60))
+        for i in range(3):
+            self.e.trigger('r:a', i)
+            self.e.trigger('r', i)
+            self.e.trigger('x:y', i)
+        self.assert_equal(self.calls, [('r:a', 0), ('r', 0), ('r', 0), ('x:y', 0), ('x:y', 1), ('x:y', 2)])
+
+        del self.calls[:]
+        self.e.trigger('r', 3, **self.e.options(throttle=False))
+        self.assert_equal(self.e.trigger(['r:a', 'x:y'], 4), [None])
+        self.assert_equal(self.calls, [('r', 3), ('x:y', 4)])
+
+        self.e.unthrottle('r')
+        self.e.trigger('r', 5)
+        self.assert_equal(self.calls[-1], ('r', 5))
+
+    def test_wild_cards_and_shared_state(self):
+        self.e.throttle('~:y', throttling.MinInterval(60, shared=True))
+        self.e.on('z:y', func_factory('z:y'))
+        self.assert_equal(self.e.trigger('x:y'), [None])
+        self.assert_equal(self.e.trigger('z:y'), [])
+        self.assert_equal(self.e.trigger('r:a'), [None, None])
+
+    def test_token_bucket(self):
+        bucket = throttling.TokenBucket(rate=0.001, capacity=3)
+        self.e.throttle('r', bucket)
+        emit = self.e.emitter('r')
+        for i in range(5):
+            emit(i)
+        self.assert_equal(self.calls, [('r', 0), ('r', 1), ('r', 2)])
+        self.assert_false(bucket.admit('r'))
+
+    def test_idle_states(self):
+        for policy in (throttling.MinInterval(0.01), throttling.TokenBucket(rate=100, capacity=1),
+                       throttling.Debounce(0.01, leading=True)):
+            for i in range(1000):
+                self.assert_true(policy.admit('cache:user:{}'.format(i)))
+            time.sleep(0.02)
+            for i in range(1000, 2000):
+                self.assert_true(policy.admit('cache:user:{}'.format(i)))
+            self.assert_true(len(policy._states) < 1500)
+            self.assert_not_in('cache:user:0', policy._states)
+            self.assert_false(policy.admit('cache:user:1999'))
+
+    def test_debounce(self):
+        self.e.throttle('r', throttling.Debounce(0.05, leading=True))
+        for i in range(5):
+            self.e.notify('r:a', i)
+        self.assert_equal(self.calls, [('r:a', 0), ('r', 0)])
+        time.sleep(0.2)
+        self.assert_equal(self.calls, [('r:a', 0), ('r', 0), ('r:a', 4), ('r', 4)])
+
+        del self.calls[:]
+        self.e.unthrottle()
+        self.e.throttle('r', throttling.Debounce(0.05))
+        self.assert_equal(list(self.e.trigger_many([('r', (i,), {}) for i in range(3)])), [[], [], []])
+        time.sleep(0.2)
+        self.assert_equal(self.calls, [('r', 2)])
+
+    def test_debounce_timers_share_thread(self):
+        threads = threading.active_count()
+        policy = throttling.Debounce(0.05)
+        self.e.throttle('r', policy)
+        for i in range(20):
+            self.e.trigger('r:{}'.format(i), i)
+        self.assert_true(threading.active_count() <= threads + 1)
+        time.sleep(0.2)
+        self.assert_equal(sorted(self.calls), sorted([('r', i) for i in range(20)]))
+
+    def test_trailing_trigger_options(self):
+        self.e.throttle('r', throttling.Debounce(0.05))
+        options = self.e.options(propagate=self.e.ES_PROPAGATE_CURRENT)
+        for i in range(3):
+            self.assert_equal(self.e.trigger('r:a', i, **options), [])
+        time.sleep(0.2)
+        # the trailing trigger keeps the propagation of the throttled one
+        self.assert_equal(self.calls, [('r:a', 2)])
+
+
+class HistoryTest(BaseTestCase):
+    def setUp(self):
+        self.e = events.Events()
+        self.calls = []
+
+    def handler(self, name):
+        return lambda *args, **kwargs: self.calls.append((name, args, kwargs))
+
+    def test_replay(self):
+        history = self.e.record('r', max_count=3)
+        self.e.trigger('r:a', 1, arg='test')
+        self.e.trigger('x', 2)
+        self.e.notify('r', 3)
+        self.e.trigger('r:b', 4)
+        self.assert_equal([record.event for record in history.records()], ['r:a', 'r', 'r:b'])
+
+        self.e.on('r:a', self.handler('r:a'), replay=5)
+        self.assert_equal(self.calls, [('r:a', (1,), {'arg': 'test'})])
+
+        del self.calls[:]
+        self.e.on('r', self.handler('r'), replay=2)
+        self.assert_equal(self.calls, [('r', (3,), {}), ('r', (4,), {})])
+
+        del self.calls[:]
+        self.e.on('~:b', self.handler('~:b'), replay=1)
+        self.e.on('x', self.handler('x'), replay=1)
+        self.assert_equal(self.calls, [('~:b', (4,), {})])
+
+    def test_patterns_and_emitters(self):
+        self.e.record('*:tick', max_count=10)
+        emit = self.e.emitter('cpu:tick')
+        emit(1)
+        list(self.e.trigger_many([('mem:tick', (2,), {}), ('mem:other', (3,), {})]))
+        self.e.on(['cpu', 'mem'], self.handler('all'), replay=10)
+        self.assert_equal(self.calls, [('all', (1,), {}), ('all', (2,), {})])
+
+        self.e.unrecord()
+        emit(4)
+        self.e.on('cpu', self.handler('cpu'), replay=10)
+        self.assert_equal(self.calls[-1], ('all', (4,), {}))
+
+    def test_stop_propagation(self):
+        self.e.record('r', max_count=3)
+        for i in range(3):
+            self.e.trigger('r', i)
+
+        def stop(value):
+            self.calls.append(('stop', (value,), {}))
+            if value % 2 == 0:
+                raise events.StopPropagation(value)
+        self.e.on('r', [stop, self.handler('r')], replay=3)
+        self.assert_equal(self.calls, [('stop', (0,), {}), ('stop', (1,), {}), ('r', (1,), {}), ('stop', (2,), {})])
+        self.assert_equal(self.e.trigger('r', 4), [4])
+
+    def test_bounded_by_bytes(self):
+        history = self.e.record('r', max_count=None, max_bytes=1000, sizeof=lambda args, kwargs: len(args[0]))
+        for size in (400, 300, 200, 5000, 500):
+            self.e.trigger('r', 'x' * size)
+        self.assert_equal([len(record.args[0]) for record in history.records()], [300, 200, 500])
+        self.assert_equal(history.bytes, 1000)
+
+
+class DeferredEventsTest(BaseTestCase):
+    def setUp(self):
+        self.e = events.Events()
+        self.calls = []
+        self.e.on('cache:invalidate', lambda *args, **kwargs: self.calls.append(('invalidate',) + args))
+        self.e.on('cache', lambda *args, **kwargs: self.calls.append(('cache',) + args))
+
+    def test_coalescing(self):
+        queue = self.e.deferred()
+        for _ in range(100):
+            queue.enqueue('cache:invalidate', 'user')
+        queue.enqueue('cache:invalidate', 'group')
+        queue.enqueue('cache:invalidate', 'user')
+        self.assert_equal(len(queue), 2)
+        self.assert_equal(self.calls, [])
+
+        self.assert_equal(queue.flush(), [[None, None], [None, None]])
+        self.assert_equal(self.calls, [('invalidate', 'user'), ('cache', 'user'),
+                                       ('invalidate', 'group'), ('cache', 'group')])
+        self.assert_equal((queue.enqueued, queue.coalesced), (102, 100))
+        self.assert_equal(queue.flush(), [])
+
+    def test_key_and_merge(self):
+        from eevent.deferred import event_key
+        merge = lambda old, new: (old[0] + new[0], {})
+        queue = self.e.deferred(key=event_key, merge=merge, **self.e.options(propagate=self.e.ES_PROPAGATE_CURRENT))
+        queue.enqueue('cache:invalidate', 'user')
+        queue.enqueue('cache:invalidate', 'group')
+        queue.enqueue('cache:invalidate', 'user', unhashable=[])
+        queue.flush()
+        self.assert_equal(self.calls, [('invalidate', 'user', 'group', 'user')])
+
+    def test_auto_flush(self):
+        queue = self.e.deferred(max_size=2, **self.e.options(propagate=self.e.ES_PROPAGATE_CURRENT))
+        queue.enqueue('cache:invalidate', 1)
+        queue.enqueue('cache:invalidate', 1)
+        self.assert_equal(self.calls, [])
+        queue.enqueue('cache:invalidate', 2)
+        self.assert_equal(self.calls, [('invalidate', 1), ('invalidate', 2)])
+
+        queue = self.e.deferred(max_delay=0)
+        queue.enqueue('cache', 3)
+        self.assert_equal(self.calls[-1], ('cache', 3))
+
+    def test_max_delay_timer(self):
+        queue = self.e.deferred(max_delay=0.05)
+        queue.enqueue('cache', 1)
+        queue.enqueue('cache', 1)
+        self.assert_equal(self.calls, [])
+        time.sleep(0.2)
+        self.assert_equal(self.calls, [('cache', 1)])
+        self.assert_equal(len(queue), 0)
+
+        queue.enqueue('cache', 2)
+        self.assert_equal(queue.discard(), 1)
+        time.sleep(0.1)
+        self.assert_equal(self.calls, [('cache', 1)])
+
+    def test_timers_share_thread(self):
+        threads = threading.active_count()
+        queues = [self.e.deferred(max_delay=0.05) for _ in range(20)]
+        for i, queue in enumerate(queues):
+            queue.enqueue('cache', i)
+        self.assert_true(threading.active_count() <= threads + 1)
+        time.sleep(0.2)
+        self.assert_equal(sorted(self.calls), [('cache', i) for i in range(20)])
+
+    def test_context_manager(self):
+        with self.e.deferred() as queue:
+            queue.enqueue('cache', 1)
+            queue.enqueue('cache', 1)
+            self.assert_equal(self.calls, [])
+        self.assert_equal(self.calls, [('cache', 1)])
+        self.assert_equal(queue.discard(), 0)
+
+
+@unittest.skipIf(asyncio is None, 'asyncio is not available')
+class AsyncTriggerTest(BaseTestCase):
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.e = events.Events()
+        self.started = []
+
+    def tearDown(self):
+        self.loop.close()
+
+    def coroutine_factory(self, some_text, delay=0.05):
+        def func(*args, **kwargs):
+            self.started.append(some_text)
+            return asyncio.sleep(delay, result=some_text)
+        return func
+
+    def trigger(self, events, *args, **kwargs):
+        return self.loop.run_until_complete(
+            self.e.trigger_async(events, *args, **dict(kwargs, event_opt_loop=self.loop)))
+
+    def test_concurrent_handlers(self):
+        self.e.on('r', self.coroutine_factory('r'))
+        self.e.on('r:a', [self.coroutine_factory('r:a', 0.1), func_factory('r:a+')])
+        self.e.on('r:a:aa', self.coroutine_factory('r:a:aa'))
+
+        started_at = time.time()
+        results = self.trigger('r:a:aa', *ARGS, **KWARGS)
+        self.assert_less(time.time() - started_at, 0.15)
+        self.assert_equal(results, ['r:a:aa', 'r', 'r:a', 'r:a+'])
+
+        results = self.trigger('r:a', **self.e.options(propagate=self.e.ES_PROPAGATE_CURRENT))
+        self.assert_equal(results, ['r:a', 'r:a+'])
+
+    def test_concurrency_limit(self):
+        self.e.on('r', [self.coroutine_factory('r1'), self.coroutine_factory('r2'), self.coroutine_factory('r3')])
+        started_at = time.time()
+        results = self.trigger('r', **self.e.options(concurrency=1))
+        self.assert_greater_equal(time.time() - started_at, 0.15)
+        self.assert_equal(results, ['r1', 'r2', 'r3'])
+        self.assert_equal(self.started, ['r1', 'r2', 'r3'])
+
+    def test_executor(self):
+        def blocking(*args, **kwargs):
+            time.sleep(0.05)
+            return 'blocking'
+        self.e.on('r', [blocking, self.coroutine_factory('r')])
+        results = self.trigger('r', **self.e.options(executor=True))
+        self.assert_equal(results, ['blocking', 'r'])
+
+    def test_cpu_bound_handlers(self):
+        self.e.on('r', process_id, cpu_bound=True)
+        self.e.on('r', self.coroutine_factory('r'))
+        pid, result = self.trigger('r')
+        self.e.shutdown()
+        self.assert_not_equal(pid, os.getpid())
+        self.assert_equal(result, 'r')
+
+    def test_unique_call(self):
+        func = self.coroutine_factory('shared', 0)
+        self.e.on(['A', 'B'], func)
+        self.assert_equal(self.trigger(['A', 'B']), ['shared'])
+        self.assert_equal(self.trigger(['A', 'B'], **self.e.options(unique_call=self.e.TB_CALL_EVERY)),
+                          ['shared', 'shared'])
+
+    def test_handler_error(self):
+        def fail(*args, **kwargs):
+            raise ValueError('fail')
+        self.e.on('r', [self.coroutine_factory('r'), fail])
+        self.assert_raises(ValueError, self.trigger, 'r')
+        self.assert_equal(self.trigger('nothing'), [])
+
+    def test_stop_propagation(self):
+        self.e.on('r', self.coroutine_factory('r'))
+        self.e.on('r:a', [self.coroutine_factory('r:a', 0.1), stop_factory('stop'), self.coroutine_factory('r:a+')])
+        self.assert_equal(self.trigger('r:a'), ['r:a', 'stop'])
+        self.started[:] = []
+        self.assert_equal(self.trigger('r:a', **self.e.options(concurrency=1)), ['r:a', 'stop'])
+        self.assert_equal(self.started, ['r:a'])
+
+    def test_time_budgets(self):
+        exceeded = []
+        self.e.budget_exceeded = lambda events, handler, budget: exceeded.append((handler, budget))
+        slow = self.coroutine_factory('slow', 1)
+        self.e.on('r', [self.coroutine_factory('r'), func_factory('r+')])
+        self.e.on('r', slow, timeout=0.1)
+
+        started_at = time.time()
+        self.assert_equal(self.trigger('r'), ['r', 'r+'])
+        self.assert_less(time.time() - started_at, 0.5)
+        self.assert_equal(exceeded, [(slow, 0.1)])
+
+        del exceeded[:]
+        self.e.on('r', self.coroutine_factory('later', 0), priority=-1)
+        results = self.trigger('r', **self.e.options(budget=0.02, concurrency=1))
+        self.assert_equal(results, [])
+        self.assert_equal(len(exceeded), 4)
+
+    def test_trailing_trigger(self):
+        self.e.on('r', self.coroutine_factory('r', 0))
+        self.e.on('r:a', self.coroutine_factory('r:a', 0))
+        self.e.throttle('r', throttling.Debounce(0.05))
+        self.assert_equal(self.trigger('r:a', **self.e.options(propagate=self.e.ES_PROPAGATE_CURRENT)), [])
+        self.loop.run_until_complete(asyncio.sleep(0.2))
+        # the trailing trigger is made in the loop with options of the throttled one
+        self.assert_equal(self.started, ['r:a'])
+
+
+@unittest.skipIf(futures is None, 'concurrent.futures is not available')
+class ThreadedTriggerTest(BaseTestCase):
+    def setUp(self):
+        self.e = events.Events()
+
+    def tearDown(self):
+        self.e.shutdown()
+
+    def blocking_factory(self, some_text, delay=0.05):
+        def func(*args, **kwargs):
+            time.sleep(delay)
+            return some_text
+        return func
+
+    def test_trigger(self):
+        self.e.THREAD_POOL_SIZE = 4
+        self.e.on('r', self.blocking_factory('r'))
+        self.e.on('r:a', [self.blocking_factory('r:a', 0.1), func_factory('r:a+')])
+        self.e.on('r:a:aa', self.blocking_factory('r:a:aa'))
+
+        started_at = time.time()
+        future = self.e.trigger_threaded('r:a:aa', *ARGS, **KWARGS)
+        self.assert_equal(future.result(), ['r:a:aa', 'r', 'r:a', 'r:a+'])
+        self.assert_less(time.time() - started_at, 0.15)
+
+        future = self.e.trigger_threaded('r:a:aa', **self.e.options(call_order=self.e.CO_FROM_THE_END))
+        self.assert_equal(future.result(), ['r:a:aa', 'r:a', 'r:a+', 'r'])
+
+        self.assert_equal(self.e.trigger_threaded('nothing').result(), [])
+
+    def test_single_pool(self):
+        self.e.on('r', self.blocking_factory('r', 0))
+        self.e.trigger_threaded('r').result()
+        pool = self.e._thread_pool
+        self.e.trigger_threaded('r').result()
+        self.assert_is(self.e._thread_pool, pool)
+
+    def test_handler_error(self):
+        def fail(*args, **kwargs):
+            raise ValueError('fail')
+        self.e.on('r', [self.blocking_factory('r'), fail])
+        self.assert_raises(ValueError, self.e.trigger_threaded('r').result)
+
+    def test_stop_propagation(self):
+        self.e.on('r', self.blocking_factory('r'))
+        self.e.on('r:a', [self.blocking_factory('r:a', 0.1), stop_factory(), self.blocking_factory('r:a+')])
+        self.assert_equal(self.e.trigger_threaded('r:a').result(), ['r:a'])
+
+    def test_time_budgets(self):
+        exceeded = []
+        self.e.budget_exceeded = lambda events, handler, budget: exceeded.append((handler, budget))
+        slow = self.blocking_factory('slow', 0.5)
+        self.e.on('r', [self.blocking_factory('r'), func_factory('r+')])
+        self.e.on('r', slow, timeout=0.1)
+
+        started_at = time.time()
+        self.assert_equal(self.e.trigger_threaded('r').result(), ['r', 'r+'])
+        self.assert_less(time.time() - started_at, 0.4)
+        self.assert_equal(exceeded, [(slow, 0.1)])
+
+        del exceeded[:]
+        self.assert_equal(self.e.trigger_threaded('r', **self.e.options(budget=0.03)).result(), ['r+'])
+        self.assert_equal(len(exceeded), 2)
+
+    def test_time_budgets_share_thread(self):
+        self.e.THREAD_POOL_SIZE = 1
+        self.e.on('r', lambda: threading.active_count(), timeout=5)
+        self.e.trigger_threaded('r').result()  # starts the pool and the watchdog threads
+        threads = self.e.trigger_threaded('r').result()[0]
+        results = [self.e.trigger_threaded('r', **self.e.options(budget=10 + i)) for i in range(20)]
+        self.assert_equal([result.result() for result in results], [[threads]] * 20)
+
+    def test_cpu_bound_handlers(self):
+        self.e.on('r', process_id, cpu_bound=True)
+        self.e.on('r', func_factory('r'))
+        self.assert_equal(list(self.e['r'].values())[0].cpu_bound, True)
+        pid, result = self.e.trigger_threaded('r', *ARGS).result()
+        self.assert_not_equal(pid, os.getpid())
+        self.assert_equal(result, 'r')
+        self.assert_equal(self.e.trigger('r'), [os.getpid(), 'r'])
+
+    def test_cpu_bound_handlers_are_picklable(self):
+        self.assert_raises(TypeError, self.e.on, 'r', lambda: None, cpu_bound=True)
+        self.assert_false('r' in self.e)
+
+
 class OptionsTest(BaseTestCase):
     def setUp(self):
         self.e = events.Events()
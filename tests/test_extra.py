@@ -1,5 +1,14 @@
+import os
+import json
+import time
+import stat
+import shutil
+import socket
+import tempfile
 import unittest
-from eevent import events
+import threading
+import multiprocessing
+from eevent import bench, events, transport
 
 
 ARGS = (123, 'abc',)
@@ -26,4 +35,162 @@ class CustomBehaviorTest(unittest.TestCase):
         class CustomEvents(events.Events):
             pass
 
-        self.e = CustomEvents()
\ No newline at end of file
+        self.e = CustomEvents()
+
+
+class BenchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.output = os.path.join(self.tmp_dir, 'results.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def run_bench(self, *args):
+        return bench.main(['--sizes', '10,100', '--handlers', '1,2', '--min-time', '0.001',
+                           '--repeat', '1', '--quiet', '--output', self.output] + list(args))
+
+    def test_results(self):
+        self.assertEqual(self.run_bench(), 0)
+        with open(self.output) as f:
+            results = json.load(f)['results']
+        self.assertEqual(len(results), 2 * 2 * (len(bench.SCENARIOS) * 2 + len(bench.CHANGING_SCENARIOS)))
+        self.assertTrue(all(result['seconds'] > 0 for result in results))
+
+    def test_baseline(self):
+        self.assertEqual(self.run_bench('--scenarios', 'plain,deep'), 0)
+        with open(self.output) as f:
+            report = json.load(f)
+        self.assertEqual(bench.compare(report['results'], report['results']), [])
+
+        for result in report['results']:
+            result['seconds'] /= 100.0
+        baseline = os.path.join(self.tmp_dir, 'baseline.json')
+        with open(baseline, 'w') as f:
+            json.dump(report, f)
+        self.assertEqual(self.run_bench('--scenarios', 'plain,deep', '--baseline', baseline), 1)
+
+
+def publish_from_process(path, event, *args):
+    with transport.BusClient(events.Events(), path, prefixes=()) as bus:
+        while bus.interest is None or not bus.publish(event, *args):
+            time.sleep(0.01)
+
+
+@unittest.skipIf(not hasattr(socket, 'AF_UNIX'), 'unix sockets are not available')
+class TransportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, 'events.sock')
+        self.hub = transport.EventsHub(self.path).start()
+        self.received = []
+
+    def tearDown(self):
+        self.hub.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def client(self, *event_names, **kwargs):
+        e = events.ThreadSafeEvents()
+        for event in event_names:
+            e.on(event, lambda *args, **kw: self.received.append((kw.get('name'), args)))
+        return transport.BusClient(e, self.path, **kwargs)
+
+    def wait_for(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_frames(self):
+        records = [transport.encode_event('r:a', ARGS, KWARGS), transport.encode_event(u'x:\xe9', (), {})]
+        data = transport.encode_frame(transport.FT_EVENTS, b''.join(records))
+        data += transport.encode_frame(transport.FT_SUBSCRIBE, transport.encode_prefixes(('r',)))
+        reader = transport.FrameReader()
+        frames = [frame for i in range(len(data)) for frame in reader.feed(data[i:i + 1])]
+        self.assertEqual([frame_type for frame_type, _ in frames], [transport.FT_EVENTS, transport.FT_SUBSCRIBE])
+        self.assertEqual(list(transport.split_events(frames[0][1])), list(zip(['r:a', u'x:\xe9'], records)))
+        self.assertEqual(transport.decode_event(records[0]), ('r:a', ARGS, KWARGS))
+        self.assertEqual(transport.decode_prefixes(frames[1][1]), ('r',))
+        self.assertRaises(TypeError, transport.encode_event, 'r', (object(),), {})
+
+    def test_socket_mode(self):
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), transport.SOCKET_MODE)
+
+    def test_prefixes(self):
+        e = events.Events()
+        for event in ['r:a:aa', 'r:a', 'app:*:done', 'app:log~', 'x:y']:
+            e[event] = [func_factory(event)]
+        self.assertEqual(transport.registry_prefixes(e), ('app', 'r:a', 'x:y'))
+        e['*:done'] = [func_factory('*:done')]
+        self.assertEqual(transport.registry_prefixes(e), ('',))
+
+        accepts = transport.PrefixFilter(['r:a', 'x'])
+        self.assertEqual([accepts(event) for event in ['r:a', 'r:a:aa', 'r:ab', 'r', 'x:y']],
+                         [True, True, False, False, True])
+
+        class DottedEvents(events.Events):
+            DELIMITER = '.'
+            WILD_CARD = '#'
+
+        e = DottedEvents()
+        for event in ['r.a:b', 'r.a', 'app.#.done', 'app.log~', 'x*.y']:
+            e[event] = [func_factory(event)]
+        self.assertEqual(transport.registry_prefixes(e), ('app', 'r.a', 'r.a:b', 'x*.y'))
+        accepts = transport.PrefixFilter(['r.a'], '.')
+        self.assertEqual([accepts(event) for event in ['r.a', 'r.a.b', 'r.a:b']], [True, True, False])
+
+    def test_start_over_file(self):
+        self.hub.close()
+        self.hub = transport.EventsHub(self.path).start()  # replaces the socket file
+        self.hub.close()
+        with open(self.path, 'w') as f:
+            f.write('data')
+        self.assertRaises(OSError, transport.EventsHub(self.path).start)
+        with open(self.path) as f:
+            self.assertEqual(f.read(), 'data')
+        os.unlink(self.path)
+        self.hub = transport.EventsHub(self.path).start()
+
+    def test_relay(self):
+        with self.client() as publisher, self.client('r:a', 'x'), self.client('r'):
+            self.wait_for(lambda: publisher.interest is not None and publisher.interest.prefixes == ('r', 'x'))
+            self.assertTrue(publisher.publish('r:a:aa', 1, name='aa'))
+            self.assertTrue(publisher.publish('r', 2, name='r'))
+            self.assertFalse(publisher.publish('z', 3, name='z'))
+            self.assertEqual(publisher.trigger('x', 4, name='x'), [])
+            self.wait_for(lambda: len(self.received) == 4)
+            self.assertEqual(sorted(self.received), [('aa', (1,)), ('aa', (1,)), ('r', (2,)), ('x', (4,))])
+
+    def test_errors(self):
+        with self.client('r'):
+            with self.client() as publisher:
+                self.wait_for(lambda: publisher.interest is not None and publisher.interest.prefixes == ('r',))
+                self.assertRaises(TypeError, publisher.publish, 'r', threading.Lock())
+                publisher._socket.shutdown(socket.SHUT_WR)
+                publisher.publish('r', 1, name='r')
+                time.sleep(0.1)
+                self.assertTrue(publisher._writer.is_alive())
+                self.assertEqual(publisher._batch, [])
+
+    def test_batching(self):
+        with self.client('r'):
+            with self.client(batch_size=10, flush_interval=60) as publisher:
+                self.wait_for(lambda: publisher.interest is not None and publisher.interest.prefixes == ('r',))
+                for i in range(5):
+                    publisher.publish('r', i, name='r')
+                time.sleep(0.1)
+                self.assertEqual(self.received, [])
+                for i in range(5, 12):
+                    publisher.publish('r', i, name='r')
+                self.wait_for(lambda: len(self.received) >= 10)
+            self.wait_for(lambda: len(self.received) == 12)
+        self.assertEqual([args for _, args in self.received], [(i,) for i in range(12)])
+
+    def test_processes(self):
+        with self.client('r'):
+            process = multiprocessing.Process(target=publish_from_process, args=(self.path, 'r:a', 'from process'))
+            process.start()
+            process.join(10)
+            self.wait_for(lambda: self.received == [(None, ('from process',))])